@@ -8,6 +8,7 @@ import logging
 
 from .config import CONFIGS
 from .utils.constants import STATICS
+from .utils.json_provider import set_json_provider
 
 from flask_openapi3 import OpenAPI
 from .api import api as bp_api
@@ -40,8 +41,10 @@ def config_app(cfgname:str):
     assert cfgname in CONFIGS.keys(), \
            f"config.config_app: `cfg_name` must be one of `{CONFIGS.keys()}`, got `{cfgname}`"
     app.config.from_object(CONFIGS[cfgname])
+    set_json_provider(app)
     db.init_app(app)
     cache.init_app(app) #, config={'CACHE_TYPE': 'SimpleCache'})
+    set_route_timeouts(app)
 
     # CORS config
     # https://readthedocs.org/projects/flask-cors/downloads/pdf/latest/
@@ -72,6 +75,9 @@ def config_app(cfgname:str):
     return app
 
 
+from .caching.cache_routes import set_route_timeouts
+from .caching.cache_http import http_caching
+from .caching.cache_thumbnails import refresh_thumbnails
 from .routes import *
 
 app.register_api(bp_api)
@@ -0,0 +1,63 @@
+"""
+benchmark the JSON providers (see `app/utils/json_provider.py`)
+on the outputs of real routes.
+
+for each route, the route's JSON is fetched once, then encoded
+`--repeat` times by each provider. the median encoding time is printed.
+
+usage (from `backend/`, the database must be available):
+    python -m app.benchmarks.bench_json -m dev
+    python -m app.benchmarks.bench_json -m dev -r 50 -u /i/place -u /i/iconography
+"""
+import statistics
+import click
+import json
+import time
+
+from ..app import config_app
+from ..utils.json_provider import JSONProvider, OrjsonProvider
+
+
+def bench(provider, obj, repeat:int) -> float:
+    """median time (in ms) to build a JSON response of `obj` with `provider`"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        provider.response(obj)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+@click.command()
+@click.option( "--mode", "-m", type=click.Choice(["dev", "test", "prod"]), default="dev"
+             , help="the app configuration. see `app/config.py`")
+@click.option( "--repeat", "-r", type=int, default=20
+             , help="number of encodings per route and provider")
+@click.option( "--url", "-u", multiple=True
+             , help="routes to benchmark. default: `CACHE_WARMUP_ROUTES` in the config")
+def run(mode:str, repeat:int, url:tuple) -> None:
+    app = config_app(mode)  # doesn't start the cache warmup: only the server entry points do
+    urls = list(url) or app.config.get("CACHE_WARMUP_ROUTES", [])
+    providers = { "default": JSONProvider(app),
+                  "orjson" : OrjsonProvider(app) }
+
+    client = app.test_client()
+    click.echo(f"{'route':<50} {'size (kB)':>10} " + " ".join(f"{p + ' (ms)':>14}" for p in providers))
+    with app.app_context():
+        for u in urls:
+            r = client.get(u)
+            if r.status_code != 200:
+                click.echo(f"{u:<50} error {r.status_code}")
+                continue
+            obj = json.loads(r.get_data())
+            # both providers must produce the same JSON
+            outputs = [ json.loads(p.response(obj).get_data()) for p in providers.values() ]
+            assert all( o == outputs[0] for o in outputs ), f"different outputs on `{u}`"
+            times = [ bench(p, obj, repeat) for p in providers.values() ]
+            click.echo( f"{u:<50} {len(r.get_data()) / 1024:>10.1f} "
+                      + " ".join(f"{t:>14.2f}" for t in times) )
+    return
+
+
+if __name__ == "__main__":
+    run()
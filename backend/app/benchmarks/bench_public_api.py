@@ -0,0 +1,66 @@
+"""
+benchmark the serialization of the public API (see `Resource.serialize`
+in `app/routes/api_public.py`) with and without the validation of the
+output by pydantic (`API_VALIDATE_OUTPUT` in the config).
+
+each route is requested `--repeat` times in both modes. the outputs
+of both modes must be the same. the median response time is printed.
+
+usage (from `backend/`, the database must be available):
+    python -m app.benchmarks.bench_public_api -m dev
+    python -m app.benchmarks.bench_public_api -m dev -r 50 -u "/api/v1/place?limit=100"
+"""
+import statistics
+import click
+import time
+
+from ..app import config_app
+
+
+DEFAULT_URLS = [ "/api/v1/iconography?limit=100" ]
+
+
+def bench(client, url:str, repeat:int) -> float:
+    """median time (in ms) to get a response from `url`"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.get(url)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+@click.command()
+@click.option( "--mode", "-m", type=click.Choice(["dev", "test", "prod"]), default="dev"
+             , help="the app configuration. see `app/config.py`")
+@click.option( "--repeat", "-r", type=int, default=20
+             , help="number of requests per route and mode")
+@click.option( "--url", "-u", multiple=True
+             , help=f"routes to benchmark. default: {', '.join(DEFAULT_URLS)}")
+def run(mode:str, repeat:int, url:tuple) -> None:
+    app = config_app(mode)  # doesn't start the cache warmup: only the server entry points do
+    urls = list(url) or DEFAULT_URLS
+    modes = { "validated": True, "trusted": False }
+
+    client = app.test_client()
+    click.echo(f"{'route':<50} " + " ".join(f"{m + ' (ms)':>16}" for m in modes))
+    for u in urls:
+        times, outputs = [], []
+        for validate in modes.values():
+            app.config["API_VALIDATE_OUTPUT"] = validate
+            r = client.get(u)
+            if r.status_code != 200:
+                break
+            outputs.append(r.get_json())
+            times.append(bench(client, u, repeat))
+        if len(times) != len(modes):
+            click.echo(f"{u:<50} error {r.status_code}")
+            continue
+        # both modes must produce the same JSON
+        assert all( o == outputs[0] for o in outputs ), f"different outputs on `{u}`"
+        click.echo(f"{u:<50} " + " ".join(f"{t:>16.2f}" for t in times))
+    return
+
+
+if __name__ == "__main__":
+    run()
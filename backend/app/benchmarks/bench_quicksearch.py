@@ -0,0 +1,86 @@
+"""
+benchmark the engines of the quick search (`QUICKSEARCH_ENGINE` in the
+config): the SQL union with ILIKE (`quick_search_ilike`) and the in-memory
+trigram index (`quick_search_memory`, see `app/search/search_trigram.py`).
+with `--fulltext`, the full-text engine is benchmarked too (the
+`quicksearch` materialized view must exist).
+
+each query string is run `--repeat` times per engine. the results of
+the ILIKE and memory engines must be the same. the 50th and 99th
+percentiles of the response times of each engine are printed.
+
+usage (from `backend/`, the database must be available):
+    python -m app.benchmarks.bench_quicksearch -m dev
+    python -m app.benchmarks.bench_quicksearch -m dev -r 50 -q "rue viv" -q richelieu --fulltext
+"""
+import statistics
+import click
+import time
+
+from ..app import config_app
+
+
+DEFAULT_QUERIES = [ "a", "ru", "rue", "richelieu", "vivienne", "palais royal"
+                  , "opéra", "bourse", "portrait", "théâtre", "café", "zzzz" ]
+
+
+def percentiles(times:list) -> tuple:
+    """p50 and p99 of `times` (in ms)"""
+    q = statistics.quantiles(times, n=100, method="inclusive")
+    return q[49] * 1000, q[98] * 1000
+
+
+@click.command()
+@click.option( "--mode", "-m", type=click.Choice(["dev", "test", "prod"]), default="dev"
+             , help="the app configuration. see `app/config.py`")
+@click.option( "--repeat", "-r", type=int, default=20
+             , help="number of runs per query string and engine")
+@click.option( "--query", "-q", multiple=True
+             , help=f"query strings to benchmark. default: {', '.join(DEFAULT_QUERIES)}")
+@click.option( "--fulltext", is_flag=True, default=False
+             , help="also benchmark the full-text engine")
+def run(mode:str, repeat:int, query:tuple, fulltext:bool) -> None:
+    app = config_app(mode)  # doesn't start the cache warmup: only the server entry points do
+    queries = list(query) or DEFAULT_QUERIES
+
+    from ..search.search_quicksearch import ( quick_search_ilike, quick_search_fulltext
+                                            , restructure_row, to_ilike )
+    from ..search.search_trigram import quick_search_memory, get_index
+
+    engines = { "ilike"   : quick_search_ilike,
+                "memory"  : lambda q: [ restructure_row(row) for row in quick_search_memory(to_ilike(q)) ] }
+    if fulltext:
+        engines["fulltext"] = quick_search_fulltext
+
+    with app.app_context():
+        start = time.perf_counter()
+        index = get_index()
+        click.echo(f"trigram index: {len(index.texts)} texts, {len(index.postings)} trigrams, "
+                   f"built in {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+        times = { e: [] for e in engines }
+        click.echo(f"{'query':<20} {'results':>8} " + " ".join(f"{e + ' p50/p99 (ms)':>24}" for e in engines))
+        for q in queries:
+            # the ILIKE and memory engines must return the same rows
+            results = { e: engines[e](q) for e in ["ilike", "memory"] }
+            key = lambda rows: sorted( (r["table_name"], r["id_uuid"], r["entry_name"] or "") for r in rows )
+            assert key(results["ilike"]) == key(results["memory"]), f"different results for `{q}`"
+
+            line = []
+            for e, f in engines.items():
+                t = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    f(q)
+                    t.append(time.perf_counter() - start)
+                times[e] += t
+                line.append("{:>11.2f} / {:>10.2f}".format(*percentiles(t)))
+            click.echo(f"{q:<20} {len(results['ilike']):>8} " + " ".join(line))
+
+        click.echo(f"{'all':<20} {'':>8} " + " ".join( "{:>11.2f} / {:>10.2f}".format(*percentiles(t))
+                                                       for t in times.values() ))
+    return
+
+
+if __name__ == "__main__":
+    run()
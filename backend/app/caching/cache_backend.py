@@ -0,0 +1,199 @@
+from flask_caching.backends.base import BaseCache
+import threading
+import sqlite3
+import pickle
+import time
+import os
+import typing as t
+
+from ..utils.constants import CACHE
+
+
+# *************************************************************
+# shared cache backend for Flask-Caching.
+#
+# `SimpleCache` keeps the cache in the memory of each process,
+# so with gunicorn every worker has its own cold cache. here,
+# the cache is stored in a local SQLite database that all
+# workers of the same server read and write, so a value
+# computed by one worker is served by all the others.
+#
+# the cache is bounded by a number of entries (`threshold`)
+# and a total size in bytes (`max_size`). when one of those
+# bounds is exceeded, expired entries are removed first, then
+# least recently used entries.
+#
+# see: https://flask-caching.readthedocs.io/en/latest/#custom-cache-backends
+#      https://www.sqlite.org/wal.html
+# *************************************************************
+
+
+class SQLiteCache(BaseCache):
+    """
+    a Flask-Caching backend storing pickled values in an SQLite database.
+
+    :param path           : path to the SQLite file. all processes sharing this
+                            path share the same cache.
+    :param threshold      : maximum number of entries. 0 means no limit.
+    :param max_size       : maximum total size of the stored values, in bytes. 0 means no limit.
+    :param default_timeout: timeout (in seconds) used if no timeout is given to `set`.
+                            a timeout of 0 means that the entry never expires.
+    :param touch_interval : the last access time of an entry (used for LRU eviction)
+                            is only updated if it is older than `touch_interval`
+                            seconds. this avoids writing to the database at every read.
+    """
+    def __init__( self
+                , path:str
+                , threshold:int=500
+                , max_size:int=0
+                , default_timeout:int=300
+                , touch_interval:int=60 ):
+        BaseCache.__init__(self, default_timeout=default_timeout)
+        self.path = path
+        self.threshold = threshold
+        self.max_size = max_size
+        self.touch_interval = touch_interval
+        self._local = threading.local()  # 1 connection / thread / process
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._create()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        cache_dir = config["CACHE_DIR"] or CACHE
+        kwargs.update(dict( threshold=config["CACHE_THRESHOLD"]
+                          , max_size=config.get("CACHE_MAX_SIZE", 0) ))
+        return cls(os.path.join(cache_dir, "cache.sqlite"), *args, **kwargs)
+
+    # ********************************************
+    # connexion and schema
+
+    @property
+    def _con(self) -> sqlite3.Connection:
+        """
+        return a connexion for the current thread. connexions must not be
+        shared between forked processes, so the pid is stored with it.
+        """
+        con = getattr(self._local, "con", None)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL;")
+            con.execute("PRAGMA synchronous=NORMAL;")
+            self._local.con = con
+            self._local.pid = os.getpid()
+        return con
+
+    def _create(self) -> None:
+        self._con.execute("""CREATE TABLE IF NOT EXISTS cache (
+                               key      TEXT PRIMARY KEY,
+                               value    BLOB NOT NULL,
+                               size     INTEGER NOT NULL,
+                               expires  REAL NOT NULL,
+                               accessed REAL NOT NULL
+                             );""")
+        self._con.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);")
+        self._con.execute("""CREATE TABLE IF NOT EXISTS cache_stats (
+                               name  TEXT PRIMARY KEY,
+                               value INTEGER NOT NULL
+                             );""")
+        self._con.execute("INSERT OR IGNORE INTO cache_stats (name, value) VALUES ('evictions', 0);")
+        return
+
+    # ********************************************
+    # helpers
+
+    def _expires(self, timeout:t.Optional[int]) -> float:
+        """convert a timeout to an expiry timestamp. 0 => never expires"""
+        timeout = self._normalize_timeout(timeout)
+        return 0 if timeout == 0 else time.time() + timeout
+
+    def _prune(self) -> None:
+        """
+        delete expired entries, then delete the least recently
+        used entries until we're below `threshold` and `max_size`.
+        """
+        now = time.time()
+        self._con.execute("DELETE FROM cache WHERE expires != 0 AND expires <= ?;", (now,))
+        count, size = self._con.execute("SELECT count(*), coalesce(sum(size), 0) FROM cache;").fetchone()
+        if not ( (self.threshold and count > self.threshold)
+                 or (self.max_size and size > self.max_size) ):
+            return
+        r = self._con.execute("SELECT key, size FROM cache ORDER BY accessed ASC;")
+        evict = []
+        for key, entry_size in r:
+            if not ( (self.threshold and count > self.threshold)
+                     or (self.max_size and size > self.max_size) ):
+                break
+            evict.append((key,))
+            count -= 1
+            size -= entry_size
+        self._con.executemany("DELETE FROM cache WHERE key = ?;", evict)
+        self._con.execute("UPDATE cache_stats SET value = value + ? WHERE name = 'evictions';", (len(evict),))
+        return
+
+    def stats(self) -> t.Dict[str, int]:
+        """
+        statistics on the cache, shared by all processes
+        (see `app/caching/cache_stats.py`).
+        """
+        count, size = self._con.execute("SELECT count(*), coalesce(sum(size), 0) FROM cache;").fetchone()
+        evictions = self._con.execute("SELECT value FROM cache_stats WHERE name = 'evictions';").fetchone()[0]
+        return { "entries"   : count,
+                 "size"      : size,      # in bytes
+                 "threshold" : self.threshold,
+                 "max_size"  : self.max_size,
+                 "evictions" : evictions  # entries removed because the cache was full
+        }
+
+    # ********************************************
+    # cachelib API
+
+    def get(self, key:str) -> t.Any:
+        now = time.time()
+        row = self._con.execute("SELECT value, expires, accessed FROM cache WHERE key = ?;", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires, accessed = row
+        if expires != 0 and expires <= now:
+            return None
+        if now - accessed > self.touch_interval:
+            self._con.execute("UPDATE cache SET accessed = ? WHERE key = ?;", (now, key))
+        try:
+            return pickle.loads(value)
+        except (pickle.PickleError, EOFError, AttributeError, ImportError):
+            return None
+
+    def set(self, key:str, value:t.Any, timeout:t.Optional[int]=None) -> bool:
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if self.max_size and len(value) > self.max_size:
+            return False
+        self._con.execute("INSERT OR REPLACE INTO cache (key, value, size, expires, accessed) "
+                          + "VALUES (?, ?, ?, ?, ?);"
+                         , (key, value, len(value), self._expires(timeout), time.time()))
+        self._prune()
+        return True
+
+    def add(self, key:str, value:t.Any, timeout:t.Optional[int]=None) -> bool:
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        # an expired entry doesn't count as existing: delete it before inserting.
+        # both statements are run in a single transaction to be atomic between workers.
+        with self._con:
+            self._con.execute("BEGIN IMMEDIATE;")
+            self._con.execute("DELETE FROM cache WHERE key = ? AND expires != 0 AND expires <= ?;", (key, now))
+            r = self._con.execute("INSERT OR IGNORE INTO cache (key, value, size, expires, accessed) "
+                                  + "VALUES (?, ?, ?, ?, ?);"
+                                 , (key, value, len(value), self._expires(timeout), now))
+        return r.rowcount == 1
+
+    def delete(self, key:str) -> bool:
+        r = self._con.execute("DELETE FROM cache WHERE key = ?;", (key,))
+        return r.rowcount == 1
+
+    def has(self, key:str) -> bool:
+        r = self._con.execute("SELECT 1 FROM cache WHERE key = ? AND (expires = 0 OR expires > ?);"
+                             , (key, time.time())).fetchone()
+        return r is not None
+
+    def clear(self) -> bool:
+        self._con.execute("DELETE FROM cache;")
+        return True
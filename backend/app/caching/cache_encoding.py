@@ -0,0 +1,84 @@
+from flask import Response, request
+import gzip
+import typing as t
+
+try:
+    import brotli  # optional: `pip install brotli`
+except ImportError:
+    brotli = None
+
+
+# *************************************************************
+# precompressed cache entries.
+#
+# instead of the Flask response, cached routes store the final
+# body, encoded once in all the content-encodings we support:
+# `identity`, `gzip` and `br` (if `brotli` is installed). on a
+# cache hit, the variant matching the `Accept-Encoding` header of
+# the request is served directly, without JSON encoding nor
+# compression.
+#
+# see: https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Accept-Encoding
+# *************************************************************
+
+
+COMPRESS_MIN_SIZE = 500  # smaller bodies are not worth compressing
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+# headers that depend on the body, and are set when decoding
+ENCODING_HEADERS = ( "Content-Length", "Content-Encoding", "ETag", "Vary" )
+
+
+class CachedResponse:
+    """
+    a response stored in the cache.
+
+    :param rv: the response to store
+    """
+    __slots__ = ( "status", "headers", "etag", "bodies" )
+
+    def __init__(self, rv:Response):
+        identity = rv.get_data()
+        etag, _ = rv.get_etag()
+        self.status  : int                       = rv.status_code
+        self.headers : t.List[t.Tuple[str, str]] = [ (k, v) for k, v in rv.headers.items()
+                                                     if k not in ENCODING_HEADERS ]
+        self.etag    : str | None                = etag
+        self.bodies  : t.Dict[str, bytes]        = { "identity": identity }  # { <content-encoding>: <body> }
+        if len(identity) >= COMPRESS_MIN_SIZE:
+            self.bodies["gzip"] = gzip.compress(identity, compresslevel=GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(identity, quality=BROTLI_QUALITY)
+
+    @property
+    def size(self) -> int:
+        """total size of all the variants, in bytes"""
+        return sum( len(b) for b in self.bodies.values() )
+
+    def choose_encoding(self) -> str:
+        """
+        choose the best content-encoding accepted by the client
+        (by quality value, then by compression ratio).
+        """
+        if not request.accept_encodings:
+            return "identity"
+        accepted = [ (request.accept_encodings.quality(enc), -len(body), enc)
+                     for enc, body in self.bodies.items()
+                     if enc == "identity" or request.accept_encodings.quality(enc) > 0 ]
+        return max(accepted)[2] if accepted else "identity"
+
+    def to_response(self) -> Response:
+        """
+        build a Flask response from the variant matching `Accept-Encoding`.
+        each variant has its own strong ETag.
+        """
+        encoding = self.choose_encoding()
+        rv = Response(self.bodies[encoding], status=self.status, headers=self.headers)
+        if len(self.bodies) > 1:
+            rv.headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            rv.headers["Content-Encoding"] = encoding
+        if self.etag is not None:
+            rv.set_etag(self.etag if encoding == "identity" else f"{self.etag}-{encoding}")
+        return rv
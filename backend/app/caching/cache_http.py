@@ -0,0 +1,50 @@
+from flask import Response, request
+
+from ..app import app
+
+
+# *************************************************************
+# HTTP caching: validators and conditional requests.
+#
+# all JSON responses of the internal (`/i/`) and public
+# (`/api/v1/`) APIs get a strong ETag (a hash of the response
+# body). when the client sends an `If-None-Match` header that
+# matches the ETag, an empty `304 Not Modified` is returned
+# instead of the full body. for cached routes, the ETag is
+# computed once and cached with the response (see
+# `cache_routes.with_etag`); for the other routes, it is computed
+# here.
+#
+# `Cache-Control` headers are defined per route in the config:
+# `CACHE_CONTROL` ({ <endpoint name>: <header value> }), with
+# `CACHE_CONTROL_DEFAULT` as a fallback.
+#
+# see: https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/ETag
+#      https://werkzeug.palletsprojects.com/en/3.0.x/wrappers/#werkzeug.wrappers.Response.make_conditional
+# *************************************************************
+
+
+HTTP_CACHED_PATHS = ( "/i/", "/api/v1/" )  # http caching is only done on our APIs
+
+
+@app.after_request
+def http_caching(response:Response) -> Response:
+    """
+    add an ETag and a `Cache-Control` header to successful API
+    responses, and return a 304 if the client aldready has the response.
+    """
+    if ( not request.path.startswith(HTTP_CACHED_PATHS)
+         or response.status_code != 200
+         or response.is_streamed ):
+        return response
+
+    if "ETag" not in response.headers:
+        response.add_etag()
+
+    cache_control = app.config.get("CACHE_CONTROL", {}).get(
+        request.endpoint, app.config.get("CACHE_CONTROL_DEFAULT", None))
+    if cache_control is not None and "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = cache_control
+
+    # returns a 304 on GET and HEAD if `If-None-Match` matches the ETag
+    return response.make_conditional(request)
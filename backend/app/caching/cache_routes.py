@@ -0,0 +1,313 @@
+from flask import Flask, Response, request, make_response, current_app
+import functools
+from urllib.parse import urlencode
+import hashlib
+import json
+import time
+import typing as t
+
+from .cache_encoding import CachedResponse
+from .cache_stats import stats
+from .cache_version import get_data_version
+from ..app import cache
+
+
+# *************************************************************
+# route-level caching helpers.
+#
+# all cached routes must use one of the decorators below instead
+# of `cache.cached()`: their cache keys contain the data version
+# (see `cache_version.py`), so that cached responses are dropped
+# when the data changes.
+# - `cached_route()` is used for routes whose response depends
+#   only on the path
+# - `cached_query()` is used for routes that receive parameters
+#   in the query string or in a JSON body: the cache key contains
+#   a canonical version of the query string and of the JSON body.
+# - `cached_listing()` is used for routes whose response depends
+#   on the path and on the `format` parameter (see
+#   `serialization/serialize_columnar.py`)
+#
+# when an entry is missing, only one request recomputes it while
+# the others wait or are served a stale copy (see `single_flight`
+# and `cached_view`).
+# *************************************************************
+
+
+def canonical_query_string() -> str:
+    """
+    build a canonical version of the query string: all (key, value) pairs
+    (including repeated keys) sorted, so that `?b=1&a=2` and `?a=2&b=1`
+    produce the same string. keys and values are url-encoded, so that
+    `?a=1&b=2` and `?a=1%26b%3D2` produce different strings.
+    """
+    return urlencode(sorted(request.args.items(multi=True)))
+
+
+def canonical_json_body() -> str:
+    """
+    build a canonical version of the JSON body of the request (dict keys
+    sorted, no whitespace). array order is kept, since it can be meaningful.
+    returns an empty string if there's no valid JSON body.
+    """
+    body = request.get_json(silent=True, cache=True)
+    if body is None:
+        return ""
+    return json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def route_key() -> str:
+    """
+    the part of the cache key that identifies a route whose response
+    depends only on the path: the request path.
+    """
+    return request.path
+
+
+def query_route_key() -> str:
+    """
+    the part of the cache key that identifies a route whose response depends
+    on the query string and on the JSON body: the path + a hash of a canonical
+    version of the query string and body (hashed to keep the keys short).
+    the parts are encoded as a JSON array, so that no query string or body
+    can be mistaken for another one.
+    """
+    params = json.dumps([ request.method, canonical_query_string(), canonical_json_body() ])
+    return f"{request.path}/{hashlib.sha1(params.encode()).hexdigest()}"
+
+
+def format_route_key() -> str:
+    """
+    the part of the cache key that identifies a route whose response
+    depends on the path and on the `format` query parameter: the path,
+    and the format if there is one. other parameters are ignored, so
+    that they don't create new cache entries.
+    """
+    fmt = request.args.get("format", None)
+    return request.path if fmt is None else f"{request.path}?format={fmt}"
+
+
+def make_cache_key(*args, **kwargs) -> str:
+    """
+    build a cache key from the data version and the path:
+    `view/<data version><request path>`.
+    `*args` and `**kwargs` are the route's arguments: they're aldready
+    in `request.path`, so they're ignored.
+    """
+    return f"view/{get_data_version()}{route_key()}"
+
+
+def make_query_cache_key(*args, **kwargs) -> str:
+    """
+    build a cache key from the data version, the path, the query string and
+    the JSON body:
+    `view/<data version><request path>/<sha1 of the query string + body>`
+    """
+    return f"view/{get_data_version()}{query_route_key()}"
+
+
+def is_cacheable(rv:Response) -> bool:
+    """
+    don't cache errors and streamed responses.
+    """
+    return rv.status_code < 400 and not rv.is_streamed
+
+
+def with_etag(f:t.Callable) -> t.Callable:
+    """
+    convert the return value of the route `f` to a `Response` and add
+    a strong ETag (a hash of the response body). used by our cache
+    decorators, so that the ETag is computed once and cached together
+    with the response (see `cache_http.py` for conditional requests).
+    """
+    @functools.wraps(f)
+    def decorated(*args, **kwargs):
+        rv = make_response(f(*args, **kwargs))
+        if rv.status_code == 200 and not rv.is_streamed:
+            rv.add_etag()
+        return rv
+    return decorated
+
+
+def single_flight( compute:t.Callable[[], t.Any]
+                 , key:str
+                 , stale:t.Optional[CachedResponse] ) -> t.Any:
+    """
+    run `compute` so that, for a given cache key, only one request (in all
+    workers) runs it at a time. this avoids a cache stampede: when an expensive
+    entry is missing, all concurrent requests would recompute it in parallel.
+
+    - the request that acquires the lock `lock/<key>` runs `compute`, which
+      stores the result in the cache.
+    - the other requests are served the `stale` response if there is one.
+      else, they wait (at most `CACHE_LOCK_WAIT` seconds) for the result to be
+      available in the cache. if it's still not there once the lock is released
+      or the wait has timed out, they compute it themselves.
+
+    :param compute: function computing the response and storing it under `key`
+    :param key    : the cache key of the route
+    :param stale  : a stale response that can be served while `compute` is running
+    :returns      : a `Response` or a `CachedResponse`
+    """
+    lock = f"lock/{key}"
+    if cache.add(lock, True, timeout=current_app.config.get("CACHE_LOCK_TIMEOUT", 120)):
+        try:
+            return compute()
+        finally:
+            cache.delete(lock)
+
+    if stale is not None:
+        return stale
+    deadline = time.time() + current_app.config.get("CACHE_LOCK_WAIT", 30)
+    while time.time() < deadline and cache.has(lock):
+        time.sleep(0.1)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[1]
+    # the lock may have been released just after the last `get`:
+    # read the entry once more before computing it
+    entry = cache.get(key)
+    if entry is not None:
+        return entry[1]
+    return compute()
+
+
+def cached_view( timeout:t.Optional[int]
+               , make_route_key:t.Callable[[], str] ) -> t.Callable:
+    """
+    our replacement for `cache.cached()`, with stampede protection
+    (see `single_flight`), stale-while-revalidate and precompressed
+    responses (see `cache_encoding.py`).
+
+    entries are stored as `(<fresh until (timestamp, 0 = always fresh)>, <CachedResponse>)`
+    under `view/<data version><route key>`. a stale-while-revalidate window can be
+    defined per route in `CACHE_STALE_WHILE_REVALIDATE` ({ <endpoint name>: <seconds> }):
+    during this window after an entry's timeout, the stale entry is served to
+    other requests while one request recomputes it. for those routes, the last
+    response is also stored under `stale/<route key>` (without the data version),
+    so that after a data version bump, the previous response is served while the
+    new one is being computed.
+
+    :param timeout       : the cache timeout. if None, `CACHE_DEFAULT_TIMEOUT` is used.
+                           it can be updated through the `cache_timeout` attribute
+                           of the decorated function (see `set_route_timeouts`)
+    :param make_route_key: function returning the route-specific part of the key
+    """
+    def decorator(f:t.Callable) -> t.Callable:
+        f = with_etag(f)
+
+        @functools.wraps(f)
+        def decorated(*args, **kwargs):
+            if current_app.config.get("CACHE_TYPE", "null") in ("null", "NullCache"):
+                return f(*args, **kwargs)  # caching is disabled (in tests)
+            timeout = decorated.cache_timeout
+            timeout = current_app.config["CACHE_DEFAULT_TIMEOUT"] if timeout is None else timeout
+            swr = current_app.config.get("CACHE_STALE_WHILE_REVALIDATE", {}).get(request.endpoint, 0)
+            route = make_route_key()
+            key = f"view/{get_data_version()}{route}"
+            now = time.time()
+
+            entry = cache.get(key)
+            if entry is not None and (entry[0] == 0 or now < entry[0]):
+                stats.record(request.endpoint, "hits")
+                return entry[1].to_response()
+            if entry is None and swr:
+                entry = cache.get(f"stale/{route}")
+            stale = entry[1] if entry is not None else None
+
+            computed = []  # not empty if this request ran `compute`
+
+            def compute() -> Response | CachedResponse:
+                computed.append(True)
+                start = time.perf_counter()
+                rv = f(*args, **kwargs)
+                duration = time.perf_counter() - start
+                stats.record(request.endpoint, "misses")
+                if not is_cacheable(rv):
+                    return rv
+                new_entry = (0 if timeout == 0 else time.time() + timeout, CachedResponse(rv))
+                cache.set(key, new_entry, timeout=0 if timeout == 0 else timeout + swr)
+                if swr:
+                    cache.set(f"stale/{route}", new_entry, timeout=0)
+                stats.record(request.endpoint, "recomputes")
+                stats.record(request.endpoint, "recompute_time", duration)
+                stats.record(request.endpoint, "bytes_stored", new_entry[1].size)
+                current_app.logger.info(f"cache: `{request.endpoint}` recomputed in {duration:.3f}s "
+                                        + f"({new_entry[1].size} bytes stored)")
+                return new_entry[1]
+
+            rv = single_flight(compute, key, stale)
+            if rv is stale:
+                stats.record(request.endpoint, "stale_hits")
+            elif isinstance(rv, CachedResponse) and not computed:
+                stats.record(request.endpoint, "hits")  # computed by another request while waiting
+            return rv.to_response() if isinstance(rv, CachedResponse) else rv
+
+        decorated.cache_timeout = timeout
+        return decorated
+    return decorator
+
+
+def cached_route(timeout:t.Optional[int]=None) -> t.Callable:
+    """
+    decorator caching a route whose response depends only on the path.
+    usage is the same as `cache.cached()`:
+
+    >>> @app.route("/i/iconography")
+    ... @cached_route()
+    ... def index_iconography(): ...
+
+    :param timeout: the cache timeout. if None, `CACHE_DEFAULT_TIMEOUT` or
+                    `CACHE_ROUTE_TIMEOUTS` is used.
+    """
+    return cached_view(timeout, route_key)
+
+
+def cached_query(timeout:t.Optional[int]=None) -> t.Callable:
+    """
+    decorator caching a route whose response depends on the query string
+    and/or on the JSON body. usage is the same as `cache.cached()`:
+
+    >>> @app.route("/i/theme")
+    ... @cached_query()
+    ... def index_theme(): ...
+
+    :param timeout: the cache timeout. if None, `CACHE_DEFAULT_TIMEOUT` or
+                    `CACHE_ROUTE_TIMEOUTS` is used.
+    """
+    return cached_view(timeout, query_route_key)
+
+
+def cached_listing(timeout:t.Optional[int]=None) -> t.Callable:
+    """
+    decorator caching a route returning a list with
+    `serialization.serialize_columnar.listing()`: the response
+    depends on the path and on the `format` parameter.
+
+    >>> @app.route("/i/iconography")
+    ... @cached_listing()
+    ... def index_iconography(): ...
+
+    :param timeout: the cache timeout. if None, `CACHE_DEFAULT_TIMEOUT` or
+                    `CACHE_ROUTE_TIMEOUTS` is used.
+    """
+    return cached_view(timeout, format_route_key)
+
+
+def set_route_timeouts(app:Flask) -> None:
+    """
+    apply the per-route timeouts defined in the config's
+    `CACHE_ROUTE_TIMEOUTS` ({ <endpoint name>: <timeout in seconds> }).
+
+    the timeout of a cached view function is exposed as the writable
+    `cache_timeout` attribute (see `cached_view`), so we just need to
+    update it. endpoints that are not in `CACHE_ROUTE_TIMEOUTS` keep the
+    default `CACHE_DEFAULT_TIMEOUT`.
+    """
+    for endpoint, timeout in app.config.get("CACHE_ROUTE_TIMEOUTS", {}).items():
+        view = app.view_functions.get(endpoint, None)
+        if view is None or not hasattr(view, "cache_timeout"):
+            app.logger.warning(f"set_route_timeouts: endpoint `{endpoint}` is not a cached route")
+            continue
+        view.cache_timeout = timeout
+    return
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+from flask import current_app
+import functools
+import threading
+import typing as t
+
+
+# *************************************************************
+# per-entity serialization cache.
+#
+# the same `Iconography.serialize_lite()` is computed by many
+# routes (iconography index, themes, named entities, places,
+# institutions, association index, search...). to avoid
+# rebuilding it for every route, serializations are memoized in
+# an in-process LRU, keyed by:
+#   `(<table name>, <id>, <serializer name>, <data version>)`
+# so that all routes share the same entries, and that entries
+# are not reused after the data changes (see `cache_version.py`).
+#
+# the size of the LRU is defined by `SERIALIZE_CACHE_SIZE`
+# in the config. 0 or undefined => no memoization.
+#
+# the memoized dicts are returned as they are, without copying
+# them (a deep copy costs about as much as the serialization):
+# they are shared by all routes and MUST NOT be modified. to
+# change a serialization, build a new dict (`{ **lite, ... }`).
+# *************************************************************
+
+
+class SerializationCache:
+    """
+    thread-safe LRU storing serialized entities.
+    the stored dicts are read-only (see above).
+    """
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key:t.Tuple) -> t.Dict | None:
+        with self._lock:
+            value = self._data.get(key, None)
+            if value is None:
+                return None
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key:t.Tuple, value:t.Dict, maxsize:int) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+        return
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+        return
+
+
+serialization_cache = SerializationCache()
+
+
+def memoized_serializer(f:t.Callable) -> t.Callable:
+    """
+    decorator memoizing a `serialize_*` method of an ORM class
+    in `serialization_cache`.
+
+    >>> class Iconography(db.Model):
+    ...     @memoized_serializer
+    ...     def serialize_lite(self): ...
+    """
+    @functools.wraps(f)
+    def decorated(self, *args, **kwargs):
+        maxsize = current_app.config.get("SERIALIZE_CACHE_SIZE", 0)
+        if not maxsize or args or kwargs:
+            return f(self, *args, **kwargs)
+        # imported here to avoid a circular import: `cache_version` imports the ORM
+        from .cache_version import get_data_version
+        key = (self.__tablename__, self.id, f.__name__, get_data_version())
+        value = serialization_cache.get(key)
+        if value is None:
+            value = f(self)
+            serialization_cache.set(key, value, maxsize)
+        return value
+    return decorated
+
+
+def memoized_bulk( tablename:str
+                 , serializer:str
+                 , ids:t.List[int]
+                 , compute:t.Callable[[t.List[int]], t.Dict[int, t.Dict]] ) -> t.List[t.Dict]:
+    """
+    bulk version of `memoized_serializer`: serialize all rows in `ids`,
+    only computing the rows that are not in `serialization_cache`.
+
+    :param tablename : the table name of the serialized class
+    :param serializer: name of the serialization method (`serialize_lite`...).
+                       `compute` must return exactly what this method returns,
+                       since they share the same cache entries.
+    :param ids       : ids of the rows to serialize
+    :param compute   : function serializing a list of ids: { <id>: <serialization> }
+    :returns         : the serializations in the order of `ids`. ids that
+                       don't exist are skipped. the dicts are read-only.
+    """
+    if not len(ids):
+        return []
+    maxsize = current_app.config.get("SERIALIZE_CACHE_SIZE", 0)
+    if not maxsize:
+        out = compute(list(dict.fromkeys(ids)))
+        return [ out[_id] for _id in ids if _id in out ]
+
+    from .cache_version import get_data_version
+    version = get_data_version()
+    out = {}
+    for _id in dict.fromkeys(ids):
+        value = serialization_cache.get((tablename, _id, serializer, version))
+        if value is not None:
+            out[_id] = value
+    missing = [ _id for _id in dict.fromkeys(ids) if _id not in out ]
+    if missing:
+        for _id, value in compute(missing).items():
+            serialization_cache.set((tablename, _id, serializer, version), value, maxsize)
+            out[_id] = value
+    return [ out[_id] for _id in ids if _id in out ]
@@ -0,0 +1,151 @@
+from collections import defaultdict
+import threading
+import click
+import time
+import os
+import typing as t
+
+from ..app import app, cache
+
+
+# *************************************************************
+# cache statistics: counters per cached endpoint, to size the
+# cache and choose the timeouts from data.
+#
+# for each endpoint, we count:
+# - `hits`          : responses served from the cache
+# - `stale_hits`    : stale responses served while another request
+#                     recomputes the entry (see `cache_routes.single_flight`)
+# - `misses`        : responses that were not in the cache
+# - `recomputes`    : number of times the route was computed and stored
+# - `recompute_time`: total time spent computing the route, in seconds
+# - `bytes_stored`  : total size of the responses stored in the cache
+#
+# counters are kept in the memory of each worker. every
+# `STATS_FLUSH_INTERVAL` seconds, each worker writes a snapshot of
+# its counters to the cache, so that the counters of all workers
+# can be aggregated by `flask cache-stats`. the statistics are not
+# exposed by a route: they describe the internals of the server.
+#
+# there is no shared list of workers: each worker claims a slot
+# (`stats/slot/<n>`, with `cache.add`, which is atomic) and writes
+# its snapshot to `stats/worker/<n>`. both keys expire after
+# `STATS_TTL` seconds, so the slots of dead workers are freed. a
+# snapshot holds the total of a worker's counters, so if it is
+# evicted, the next snapshot restores it. the counters of a worker
+# that hasn't served a cached route for `STATS_TTL` are not counted.
+#
+# evictions are counted by the cache backend for the whole cache,
+# not per endpoint (`backend.evictions`).
+# *************************************************************
+
+
+STATS_FLUSH_INTERVAL = 10   # seconds between 2 snapshots of a worker's counters
+STATS_TTL = 3600            # seconds before the slot and snapshot of an inactive worker expire
+STATS_MAX_WORKERS = 64      # number of slots: workers beyond that are not counted
+
+COUNTERS = ( "hits", "stale_hits", "misses", "recomputes", "recompute_time", "bytes_stored" )
+
+
+class CacheStats:
+    """
+    thread-safe counters for the cached endpoints of a worker.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self._last_flush = 0
+        self._slot = None
+
+    def record(self, endpoint:str, counter:str, value:int|float=1) -> None:
+        """
+        increment `counter` for `endpoint` by `value`
+        """
+        with self._lock:
+            self._endpoints[endpoint][counter] += value
+        self.flush()
+        return
+
+    def snapshot(self) -> t.Dict[str, t.Dict]:
+        """
+        return a copy of the counters: { <endpoint>: { <counter>: <value> } }
+        """
+        with self._lock:
+            return { k: dict(v) for k, v in self._endpoints.items() }
+
+    def flush(self, force:bool=False) -> None:
+        """
+        write a snapshot of the counters to the cache, at most
+        every `STATS_FLUSH_INTERVAL` seconds.
+        """
+        now = time.time()
+        if not force and now - self._last_flush < STATS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        if not len(self._endpoints):  # nothing to count: don't take a slot
+            return
+        slot = self.claim_slot()
+        if slot is not None:
+            cache.set(f"stats/worker/{slot}", self.snapshot(), timeout=STATS_TTL)
+        return
+
+    def claim_slot(self) -> t.Optional[int]:
+        """
+        return the slot of the current worker, after refreshing it. if the
+        worker has no slot (or has lost it), claim the first free one.
+        None if all slots are taken.
+        """
+        pid = os.getpid()
+        if self._slot is not None and cache.get(f"stats/slot/{self._slot}") == pid:
+            cache.set(f"stats/slot/{self._slot}", pid, timeout=STATS_TTL)
+            return self._slot
+        self._slot = None
+        for n in range(STATS_MAX_WORKERS):
+            if cache.add(f"stats/slot/{n}", pid, timeout=STATS_TTL) or cache.get(f"stats/slot/{n}") == pid:
+                self._slot = n
+                break
+        return self._slot
+
+
+stats = CacheStats()
+
+
+def aggregate_stats() -> t.Dict:
+    """
+    sum the counters of all workers and add the state of the cache backend.
+    the snapshots are read as they are: nothing is written to the cache.
+
+    :returns: { "endpoints": { <endpoint>: { <counter>: <value>, "hit_ratio": <float> } },
+                "workers": <number of workers with a snapshot>,
+                "backend": <statistics of the whole cache, if the backend provides them> }
+    """
+    snapshots = [ cache.get(f"stats/worker/{n}") for n in range(STATS_MAX_WORKERS) ]
+    snapshots = [ s for s in snapshots if s is not None ]
+    endpoints = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for snapshot in snapshots:
+        for endpoint, counters in snapshot.items():
+            for k, v in counters.items():
+                endpoints[endpoint][k] += v
+    for counters in endpoints.values():
+        served = counters["hits"] + counters["stale_hits"] + counters["misses"]
+        counters["hit_ratio"] = round((counters["hits"] + counters["stale_hits"]) / served, 3) if served else None
+        counters["recompute_time"] = round(counters["recompute_time"], 3)
+
+    backend = getattr(cache.cache, "stats", None)  # only `SQLiteCache` provides statistics
+    return { "endpoints": dict(sorted(endpoints.items())),
+             "workers": len(snapshots),
+             "backend": backend() if backend is not None else None }
+
+
+@app.cli.command("cache-stats")
+def cache_stats_command() -> None:
+    """
+    print the cache statistics of all workers.
+    """
+    out = aggregate_stats()
+    click.echo(f"workers: {out['workers']}, backend: {out['backend']}")
+    for endpoint, c in out["endpoints"].items():
+        click.echo(f"{endpoint}: hit ratio {c['hit_ratio']}, {c['hits']} hits, {c['stale_hits']} stale hits, "
+                   + f"{c['misses']} misses, {c['recomputes']} recomputes in {c['recompute_time']}s, "
+                   + f"{c['bytes_stored']} bytes stored")
+    return
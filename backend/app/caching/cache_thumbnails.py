@@ -0,0 +1,115 @@
+from sqlalchemy import select, func, literal, cast, Text, Select
+from flask import g, has_app_context
+import click
+import typing as t
+
+from .cache_version import get_data_version
+from ..app import app, db, cache
+from ..orm import Theme, NamedEntity, R_IconographyTheme, R_IconographyNamedEntity, Filename
+
+
+# *************************************************************
+# precomputed thumbnails for themes and named entities.
+#
+# each theme and named entity is illustrated by the thumbnail
+# of one of its iconography resources. instead of picking one
+# at random for every serialization (which loads all relation
+# rows and makes cached responses nondeterministic), the
+# thumbnails of all themes / named entities are chosen in one
+# query and stored in the cache.
+#
+# the choice is deterministic: iconography resources are ordered
+# by `md5(<seed> || <iconography id>)`. the seed is
+# `THUMBNAIL_SEED` in the config. the thumbnails are part of
+# cached responses that only change with the data version, so
+# to choose other thumbnails, change the seed and bump the
+# data version (`flask cache-bump-version --force`).
+#
+# the mapping is computed when it's not in the cache, or with:
+# `flask --app "app.app:config_app('prod')" thumbnails-refresh`
+# *************************************************************
+
+
+# { <table name>: (<relationship table>, <foreign key to the table>) }
+THUMBNAIL_TABLES = { Theme.__tablename__       : (R_IconographyTheme, R_IconographyTheme.id_theme),
+                     NamedEntity.__tablename__ : (R_IconographyNamedEntity, R_IconographyNamedEntity.id_named_entity) }
+
+
+def thumbnail_seed() -> str:
+    """
+    return the seed used to choose the thumbnails (`THUMBNAIL_SEED`)
+    """
+    return str(app.config.get("THUMBNAIL_SEED", ""))
+
+
+def thumbnails_query(tablename:str, seed:str) -> Select:
+    """
+    build the query choosing a thumbnail for every row of `tablename`:
+    for each row, the first thumbnail of the first iconography resource
+    ordered by `md5(<seed> || <iconography id>)`.
+    the query returns 2 columns: `id` (the row id) and `url` (the thumbnail).
+    """
+    rel, fk = THUMBNAIL_TABLES[tablename]
+    return ( select(fk.label("id"), Filename.url.label("url"))
+             .join(Filename, Filename.id_iconography == rel.id_iconography)
+             .filter(Filename.url.contains("thumbnail"))
+             .distinct(fk)
+             .order_by( fk
+                      , func.md5(literal(seed) + cast(rel.id_iconography, Text))
+                      , Filename.id ) )
+
+
+def compute_thumbnails(tablename:str, seed:str) -> t.Dict[int, str]:
+    """
+    choose a thumbnail for every row of `tablename` in a single query.
+
+    :returns: { <row id>: <thumbnail url> }. rows without any thumbnail
+              are not in the output.
+    """
+    r = db.session.execute(thumbnails_query(tablename, seed))
+    return { row[0]: row[1] for row in r.all() }
+
+
+def get_thumbnails(tablename:str) -> t.Dict[int, str]:
+    """
+    return the thumbnail mapping for `tablename` ({ <row id>: <thumbnail url> }).
+    it is read from the cache once per request, and computed if it's missing.
+    """
+    seed = thumbnail_seed()
+    if has_app_context() and (tablename, seed) in g.setdefault("thumbnails", {}):
+        return g.thumbnails[(tablename, seed)]
+    key = f"thumbnails/{get_data_version()}/{tablename}/{seed}"
+    thumbnails = cache.get(key)
+    if thumbnails is None:
+        thumbnails = compute_thumbnails(tablename, seed)
+        cache.set(key, thumbnails, timeout=0)
+    if has_app_context():
+        g.thumbnails[(tablename, seed)] = thumbnails
+    return thumbnails
+
+
+def refresh_thumbnails() -> t.Dict[str, int]:
+    """
+    recompute the thumbnail mappings of all tables and store them in the cache.
+
+    :returns: { <table name>: <number of rows with a thumbnail> }
+    """
+    seed = thumbnail_seed()
+    out = {}
+    for tablename in THUMBNAIL_TABLES.keys():
+        thumbnails = compute_thumbnails(tablename, seed)
+        cache.set(f"thumbnails/{get_data_version()}/{tablename}/{seed}", thumbnails, timeout=0)
+        if has_app_context():
+            g.setdefault("thumbnails", {})[(tablename, seed)] = thumbnails
+        out[tablename] = len(thumbnails)
+    return out
+
+
+@app.cli.command("thumbnails-refresh")
+def thumbnails_refresh_command() -> None:
+    """
+    recompute the thumbnails of themes and named entities.
+    """
+    for tablename, count in refresh_thumbnails().items():
+        click.echo(f"{tablename}: {count} thumbnails")
+    return
@@ -0,0 +1,107 @@
+from sqlalchemy import select, func, literal, union_all
+from flask import g, has_app_context
+import hashlib
+import click
+import time
+
+from ..app import app, db, cache
+from ..orm import ( Iconography, Title, Actor, Theme, NamedEntity, Place
+                  , Address, Institution, Cartography, Filename, Licence
+                  , R_IconographyActor, R_IconographyTheme, R_IconographyNamedEntity
+                  , R_IconographyPlace, R_CartographyPlace, R_AddressPlace, R_Institution )
+
+
+# *************************************************************
+# data version: a short token describing the state of the
+# database. the token is included in all cache keys, so cache
+# entries can live indefinitely: when the data changes (after
+# an import), the token changes, and all the previous cache
+# entries stop being used (they'll be evicted by the cache
+# backend's size limits).
+#
+# the token is a hash of the number of rows and max id of each
+# table that is exposed by the API. it is stored in the cache, so
+# that it is computed only once for all workers. after an import,
+# the token must be recomputed by running:
+# `flask --app "app.app:config_app('prod')" cache-bump-version`
+# (`/i/cache/version` is read-only: it is public, and a recomputation
+# invalidates the whole cache)
+# *************************************************************
+
+
+VERSION_KEY = "data/version"  # cache key under which the data version is stored
+
+# tables whose content changes the data version
+VERSIONED_TABLES = [ Iconography, Title, Actor, Theme, NamedEntity, Place
+                   , Address, Institution, Cartography, Filename, Licence
+                   , R_IconographyActor, R_IconographyTheme, R_IconographyNamedEntity
+                   , R_IconographyPlace, R_CartographyPlace, R_AddressPlace, R_Institution ]
+
+
+def compute_data_version(salt:str="") -> str:
+    """
+    compute the data version from the database: a hash of the
+    `(<table name>, <row count>, <max id>)` of all `VERSIONED_TABLES`.
+
+    :param salt: an extra string to add to the hash, to force
+                 a new version even if the counts haven't changed
+                 (for example, if rows have been updated).
+    """
+    q = union_all(*[ select( literal(t.__tablename__)
+                           , func.count(t.id)
+                           , func.coalesce(func.max(t.id), 0) )
+                     for t in VERSIONED_TABLES ])
+    r = sorted( tuple(row) for row in db.session.execute(q).all() )
+    return hashlib.sha1(f"{r}{salt}".encode()).hexdigest()[:12]
+
+
+def get_data_version() -> str:
+    """
+    return the current data version. it is read from the cache once per
+    request (and stored in `flask.g`). if it's not in the cache, it is
+    computed from the database and stored in the cache without timeout.
+    """
+    if has_app_context() and "data_version" in g:
+        return g.data_version
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = compute_data_version()
+        cache.set(VERSION_KEY, version, timeout=0)
+    if has_app_context():
+        g.data_version = version
+    return version
+
+
+def bump_data_version(force:bool=False) -> str:
+    """
+    recompute the data version and store it in the cache. the version only
+    changes if the data has changed, unless `force` is True.
+
+    if the version changes and the quick search uses the full-text
+    engine, its index (the `quicksearch` materialized view) is refreshed.
+
+    :returns: the new data version
+    """
+    old = cache.get(VERSION_KEY)
+    version = compute_data_version(salt=str(time.time()) if force else "")
+    if version != old and app.config.get("QUICKSEARCH_ENGINE", "ilike") == "fulltext":
+        # imported here, so that the search module is only loaded by the routes
+        from ..search.search_quicksearch import refresh_quicksearch
+        refresh_quicksearch()
+    cache.set(VERSION_KEY, version, timeout=0)
+    if has_app_context():
+        g.data_version = version
+    return version
+
+
+@app.cli.command("cache-bump-version")
+@click.option( "--force", "-f", is_flag=True, default=False
+             , help="create a new version even if the row counts haven't changed")
+def cache_bump_version_command(force:bool) -> None:
+    """
+    recompute the data version after an import, invalidating the cache.
+    """
+    old = cache.get(VERSION_KEY)
+    new = bump_data_version(force=force)
+    click.echo(f"data version: {old} -> {new}")
+    return
@@ -0,0 +1,104 @@
+from flask import Flask
+import threading
+import click
+import time
+import typing as t
+
+from ..app import app, cache
+
+
+# *************************************************************
+# cache warm up: after a deploy or a worker restart, the cache
+# is empty and the first visitors pay for the heavy routes being
+# computed. here, we request the routes listed in the config's
+# `CACHE_WARMUP_ROUTES` with the test client, which computes
+# them and fills the cache before real visitors arrive.
+#
+# warm up can be run:
+# - from the command line: `flask --app "app.app:config_app('prod')" cache-warmup`
+# - by the server entry points, if `CACHE_WARMUP` is set in the
+#   config: "sync" (blocks until the cache is full) or "background".
+#   with gunicorn, `gunicorn.conf.py` runs `cache-warmup` once, in
+#   the master process, before the workers are started. with the
+#   development server, `main.py` calls `start_warmup`.
+#
+# `config_app` never starts the warm up: it is also run by all
+# `flask ...` commands, which would each start a warm up.
+# *************************************************************
+
+
+WARMUP_LOCK = "warmup/lock"  # cache key preventing several processes from warming up at the same time
+WARMUP_LOCK_TIMEOUT = 60     # the lock expires if it isn't refreshed (after each route) for this long
+
+
+def warmup(_app:Flask, refresh_lock:bool=False) -> t.List[t.Tuple[str, int, float]]:
+    """
+    request all routes in `CACHE_WARMUP_ROUTES` to fill the cache.
+    the time taken by each route is logged.
+
+    :param refresh_lock: if True, `WARMUP_LOCK` is refreshed after each route,
+        so that it expires soon after the process holding it stops.
+    :returns: a list of `(<route>, <http status code>, <time in seconds>)`
+    """
+    out = []
+    client = _app.test_client()
+    for route in _app.config.get("CACHE_WARMUP_ROUTES", []):
+        if refresh_lock:
+            cache.set(WARMUP_LOCK, True, timeout=WARMUP_LOCK_TIMEOUT)
+        start = time.perf_counter()
+        try:
+            status = client.get(route).status_code
+        except Exception as e:
+            _app.logger.error(f"cache warmup: error on `{route}`: {e}")
+            status = 500
+        duration = time.perf_counter() - start
+        _app.logger.info(f"cache warmup: `{route}` -> {status} in {duration:.3f}s")
+        out.append(( route, status, duration ))
+    return out
+
+
+def warmup_once(_app:Flask) -> t.List[t.Tuple[str, int, float]]:
+    """
+    run `warmup` if no other process is aldready doing it. since the
+    cache can be shared between gunicorn workers, only one process needs
+    to warm it up: `cache.add` is used as a lock between processes.
+
+    :returns: the output of `warmup`, or `[]` if it was skipped
+    """
+    with _app.app_context():
+        if not cache.add(WARMUP_LOCK, True, timeout=WARMUP_LOCK_TIMEOUT):
+            _app.logger.info("cache warmup: aldready running in another process, skipping")
+            return []
+        try:
+            return warmup(_app, refresh_lock=True)
+        finally:
+            cache.delete(WARMUP_LOCK)
+
+
+def start_warmup(_app:Flask) -> None:
+    """
+    start the warm up depending on the value of `CACHE_WARMUP` in the config:
+    - "sync"      : warm up now, before the app takes traffic
+    - "background": warm up in a daemon thread
+    - anything else: no warm up
+    this must only be called by a server entry point (see `main.py`),
+    not by `config_app`.
+    """
+    mode = _app.config.get("CACHE_WARMUP", None)
+    if mode == "sync":
+        warmup_once(_app)
+    elif mode == "background":
+        threading.Thread(target=warmup_once, args=(_app,), daemon=True).start()
+    return
+
+
+@app.cli.command("cache-warmup")
+def cache_warmup_command() -> None:
+    """
+    request all cached routes listed in `CACHE_WARMUP_ROUTES` to fill the cache.
+    """
+    results = warmup_once(app)
+    for route, status, duration in results:
+        click.echo(f"{duration:>8.3f}s  {status}  {route}")
+    click.echo(f"{sum(r[2] for r in results):>8.3f}s  total")
+    return
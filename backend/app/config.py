@@ -2,7 +2,7 @@ from sqlalchemy import URL
 import json
 import os
 
-from .utils.constants import CONFIDENTIALS
+from .utils.constants import CONFIDENTIALS, CACHE
 
 
 # ***************************************************************************************************************
@@ -27,6 +27,45 @@ def db_uri(params:dict) -> str:
                      , database=params["db"] )
 
 
+# per-route cache timeouts (in seconds), overriding `CACHE_DEFAULT_TIMEOUT`.
+# { <endpoint name>: <timeout> }, for ex: `{ "cartography_places": 3600 }`.
+# since the cache keys contain the data version, cache entries don't need
+# to expire: by default, they live until the data changes.
+CACHE_ROUTE_TIMEOUTS = {}
+
+# routes requested to fill the cache on startup (see `app/caching/cache_warmup.py`)
+CACHE_WARMUP_ROUTES = [ "/i/cartography-main/places"
+                      , "/i/iconography"
+                      , "/i/place"
+                      , "/i/theme/tree/all"
+                      , "/i/named-entity/tree/all"
+                      , "/i/institution"
+                      , "/i/theme"
+                      , "/i/theme?preview=true"
+                      , "/i/named-entity"
+                      , "/i/named-entity?preview=true"
+                      , "/i/cartography-main/cartography/source"
+                      ]
+
+# stale-while-revalidate windows (in seconds) for the most expensive routes
+# (see `app/caching/cache_routes.py`): when their cache entry is missing or
+# expired, one request recomputes it while the others get the previous response.
+CACHE_STALE_WHILE_REVALIDATE = { "cartography_places": 600
+                               , "index_iconography" : 600 }
+
+# `Cache-Control` headers for the API routes (see `app/caching/cache_http.py`).
+# by default, clients must revalidate their copy using the ETag (and get a 304
+# if it hasn't changed). the heavy routes can be reused for a while without revalidating.
+CACHE_CONTROL_DEFAULT = "no-cache"
+CACHE_CONTROL = { "cartography_places"        : "public, max-age=3600"
+                , "index_iconography"         : "public, max-age=3600"
+                , "index_place"               : "public, max-age=3600"
+                , "theme_category_tree"       : "public, max-age=3600"
+                , "named_entity_category_tree": "public, max-age=3600"
+                , "institution"               : "public, max-age=3600"
+                }
+
+
 # testing the app locally
 class TEST:
     with open(os.path.join(CONFIDENTIALS, "postgresql_credentials_local.json"), mode="r") as fh:
@@ -34,6 +73,7 @@ class TEST:
     SQLALCHEMY_DATABASE_URI = db_uri(params)
     SQLALCHEMY_ECHO = False
     TESTING = True
+    API_VALIDATE_OUTPUT = True    # validate the output of the public API against its pydantic models
 
 # local development
 class DEV:
@@ -42,7 +82,21 @@ class DEV:
     SQLALCHEMY_DATABASE_URI = db_uri(params)
     SQLALCHEMY_ECHO = False
     CACHE_TYPE = "SimpleCache"  # Flask-Caching related configs
-    CACHE_DEFAULT_TIMEOUT= 300
+    CACHE_DEFAULT_TIMEOUT= 0    # never expires: cache entries are invalidated by the data version
+    CACHE_ROUTE_TIMEOUTS = CACHE_ROUTE_TIMEOUTS
+    CACHE_WARMUP_ROUTES = CACHE_WARMUP_ROUTES
+    CACHE_CONTROL_DEFAULT = CACHE_CONTROL_DEFAULT
+    CACHE_CONTROL = CACHE_CONTROL
+    CACHE_STALE_WHILE_REVALIDATE = CACHE_STALE_WHILE_REVALIDATE
+    CACHE_LOCK_TIMEOUT = 120     # max duration of a recomputation before another request can retry it
+    CACHE_LOCK_WAIT = 30         # how long requests wait for another request's recomputation
+    SERIALIZE_CACHE_SIZE = 20000  # max number of memoized serializations (`app/caching/cache_serialize.py`)
+    THUMBNAIL_SEED = "richelieu"  # seed used to choose the thumbnails of themes and named entities
+    SERIALIZATION_ENGINE = "orm"  # "orm" or "sql": build the index routes in python or in postgres (`app/serialization/serialize_sql.py`)
+    JSON_PROVIDER = "orjson"      # "orjson" or "default": library used by `jsonify` (`app/utils/json_provider.py`)
+    API_VALIDATE_OUTPUT = True    # validate the output of the public API against its pydantic models
+    QUICKSEARCH_ENGINE = "ilike"  # "ilike", "fulltext" (needs `db/20261018_quicksearch_fulltext.sql`) or "memory" (`app/search/search_trigram.py`). see `app/search/search_quicksearch.py`
+    SEARCH_ENGINE = "sql"         # "sql" or "bitmap": run the advanced search in postgres or in memory (`app/search/search_bitmap.py`)
 
 # on production / server
 class PROD:
@@ -52,8 +106,26 @@ class PROD:
     SQLALCHEMY_ECHO = False
     #SERVER_NAME = "172.17.1.142:5001"
     SERVER_NAME = "quartier-richelieu.inha.fr:5001"
-    CACHE_TYPE = "SimpleCache"  # Flask-Caching related configs
-    CACHE_DEFAULT_TIMEOUT= 300
+    CACHE_TYPE = "app.caching.cache_backend.SQLiteCache"  # Flask-Caching related configs. this cache is shared by all gunicorn workers
+    CACHE_DIR = CACHE
+    CACHE_THRESHOLD = 2000               # max number of cache entries
+    CACHE_MAX_SIZE = 500 * 1024 * 1024   # max size of the cache, in bytes
+    CACHE_DEFAULT_TIMEOUT= 0             # never expires: cache entries are invalidated by the data version
+    CACHE_ROUTE_TIMEOUTS = CACHE_ROUTE_TIMEOUTS
+    CACHE_WARMUP_ROUTES = CACHE_WARMUP_ROUTES
+    CACHE_WARMUP = "sync"        # fill the cache when the server starts: "sync", "background" or None. see `gunicorn.conf.py`
+    CACHE_CONTROL_DEFAULT = CACHE_CONTROL_DEFAULT
+    CACHE_CONTROL = CACHE_CONTROL
+    CACHE_STALE_WHILE_REVALIDATE = CACHE_STALE_WHILE_REVALIDATE
+    CACHE_LOCK_TIMEOUT = 120     # max duration of a recomputation before another request can retry it
+    CACHE_LOCK_WAIT = 30         # how long requests wait for another request's recomputation
+    SERIALIZE_CACHE_SIZE = 20000  # max number of memoized serializations (`app/caching/cache_serialize.py`)
+    THUMBNAIL_SEED = "richelieu"  # seed used to choose the thumbnails of themes and named entities
+    SERIALIZATION_ENGINE = "orm"  # "orm" or "sql": build the index routes in python or in postgres (`app/serialization/serialize_sql.py`)
+    JSON_PROVIDER = "orjson"      # "orjson" or "default": library used by `jsonify` (`app/utils/json_provider.py`)
+    API_VALIDATE_OUTPUT = False   # validate the output of the public API against its pydantic models
+    QUICKSEARCH_ENGINE = "ilike"  # "ilike", "fulltext" (needs `db/20261018_quicksearch_fulltext.sql`) or "memory" (`app/search/search_trigram.py`). see `app/search/search_quicksearch.py`
+    SEARCH_ENGINE = "sql"         # "sql" or "bitmap": run the advanced search in postgres or in memory (`app/search/search_bitmap.py`)
 
 # dict to choose the config based on a key
 CONFIGS = { "dev"  : DEV,
@@ -43,9 +43,9 @@ class Institution(db.Model):
         return self.entry_name
 
     def get_iconography(self):
-        return [ r.iconography.serialize_lite()
-                 for r in self.r_institution
-                 if r.iconography is not None ]
+        return Iconography.serialize_lite_bulk([ r.id_iconography
+                                                 for r in self.r_institution
+                                                 if r.id_iconography is not None ])
 
     def get_cartography(self):
         return [ r.cartography.serialize_lite()
@@ -149,9 +149,9 @@ class AdminPerson(db.Model):
         return f"{self.first_name} {self.last_name}"
 
     def get_r_admin_person_iconography(self):
-        return [ r.iconography.serialize_lite()
-                 for r in self.r_admin_person
-                 if r.iconography is not None ]
+        return Iconography.serialize_lite_bulk([ r.id_iconography
+                                                 for r in self.r_admin_person
+                                                 if r.id_iconography is not None ])
 
     def get_r_admin_person_cartography(self):
         return [ r.cartography.serialize_lite()
@@ -179,3 +179,4 @@ class AdminPerson(db.Model):
         }
 
 
+from .data_sources import Iconography
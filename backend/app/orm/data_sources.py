@@ -1,10 +1,11 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
-from sqlalchemy import ForeignKey, Text, Boolean, Float
+from sqlalchemy import ForeignKey, Text, Boolean, Float, select
 from sqlalchemy.dialects import postgresql as psql
 import typing as t
 import intervals
 
 from ..utils.converters import int4range2list
+from ..caching.cache_serialize import memoized_serializer, memoized_bulk
 from ..utils.strings import _validate_uuid
 from ..app import db
 
@@ -49,12 +50,12 @@ class Iconography(db.Model):
     represents       : Mapped[bool]        = mapped_column(Boolean, nullable=True, comment="represente")
     id_licence       : Mapped[int]         = mapped_column(psql.INTEGER, ForeignKey("licence.id"), nullable=False, comment="identifiant interne de la licence")
 
-    title                      : Mapped[t.List["Title"]]                    = relationship("Title", back_populates="iconography", lazy="selectin")
+    title                      : Mapped[t.List["Title"]]                    = relationship("Title", back_populates="iconography")
     annotation                 : Mapped[t.List["Annotation"]]               = relationship("Annotation", back_populates="iconography")
-    filename                   : Mapped[t.List["Filename"]]                 = relationship("Filename", back_populates="iconography", lazy="selectin")
+    filename                   : Mapped[t.List["Filename"]]                 = relationship("Filename", back_populates="iconography")
     licence                    : Mapped["Licence"]                          = relationship("Licence", back_populates="iconography")
     r_iconography_theme        : Mapped[t.List["R_IconographyTheme"]]       = relationship("R_IconographyTheme", back_populates="iconography")
-    r_iconography_actor        : Mapped[t.List["R_IconographyActor"]]       = relationship("R_IconographyActor", back_populates="iconography", lazy="selectin")
+    r_iconography_actor        : Mapped[t.List["R_IconographyActor"]]       = relationship("R_IconographyActor", back_populates="iconography")
     r_iconography_place        : Mapped[t.List["R_IconographyPlace"]]       = relationship("R_IconographyPlace", back_populates="iconography")
     r_iconography_named_entity : Mapped[t.List["R_IconographyNamedEntity"]] = relationship("R_IconographyNamedEntity", back_populates="iconography")
     r_admin_person             : Mapped[t.List["R_AdminPerson"]]            = relationship("R_AdminPerson", back_populates="iconography")
@@ -128,6 +129,7 @@ class Iconography(db.Model):
                  for f in self.filename
                  if "thumbnail" in f.url ]
 
+    @memoized_serializer  # shared by all routes listing iconography, see `app/caching/cache_serialize.py`
     def serialize_lite(self) -> t.Dict:
         return { "id_uuid"   : self.id_uuid,               # str
                  "iiif_url"  : self.iiif_url,              # str
@@ -137,7 +139,64 @@ class Iconography(db.Model):
                  "thumbnail" : self.get_thumbnail(),       # t.List[str]
         }
 
-    def serialize_full(self) -> t.Dict:
+    @classmethod
+    def serialize_lite_bulk(cls, ids:t.List[int]) -> t.List[t.Dict]:
+        """
+        the same as `[ i.serialize_lite() for i in <iconography objects> ]`,
+        but in a fixed number of queries (1 for iconography, titles, authors
+        and thumbnails each), instead of loading the related rows object by
+        object. this is used by all routes returning lists of iconography.
+
+        :param ids: a list of `Iconography.id`
+        :returns  : the `serialize_lite` of each id, in the order of `ids`
+        """
+        def compute(_ids:t.List[int]) -> t.Dict[int, t.Dict]:
+            titles, authors, thumbnails = {}, {}, {}
+            for row in db.session.execute(
+                select(Title.id_iconography, Title.entry_name, Title.ismain)
+                .filter(Title.id_iconography.in_(_ids))
+                .order_by(Title.id)
+            ):
+                titles.setdefault(row[0], []).append([ row[1], row[2] ])
+            for row in db.session.execute(
+                select(R_IconographyActor.id_iconography, Actor.id_uuid, Actor.entry_name, R_IconographyActor.ismain)
+                .join(R_IconographyActor.actor)
+                .filter( R_IconographyActor.id_iconography.in_(_ids)
+                       , R_IconographyActor.role == "author" )
+                .order_by(R_IconographyActor.id)
+            ):
+                authors.setdefault(row[0], []).append([ { "id_uuid": row[1], "entry_name": row[2] }, row[3] ])
+            for row in db.session.execute(
+                select(Filename.id_iconography, Filename.url, Filename.latlngbounds)
+                .filter( Filename.id_iconography.in_(_ids)
+                       , Filename.url.contains("thumbnail") )
+                .order_by(Filename.id)
+            ):
+                thumbnails.setdefault(row[0], []).append({ "url": row[1], "latlngbounds": row[2] })
+
+            # same structure and ordering as `serialize_lite`, `get_author` and `get_title`
+            return { row[0]: { "id_uuid"   : row[1],
+                               "iiif_url"  : row[2],
+                               "date"      : int4range2list(row[3]),
+                               "authors"   : [ a[0] for a in sorted(authors.get(row[0], []), key=lambda x: x[1]) ],
+                               "title"     : [ t[0] for t in sorted(titles.get(row[0], []), key=lambda x: x[1]) ],
+                               "thumbnail" : thumbnails.get(row[0], []) }
+                     for row in db.session.execute(
+                         select(cls.id, cls.id_uuid, cls.iiif_url, cls.date)
+                         .filter(cls.id.in_(_ids))
+                     ) }
+
+        return memoized_bulk(cls.__tablename__, "serialize_lite", ids, compute)
+
+    def serialize_full( self
+                      , place:t.Optional[t.List[t.Dict]]=None
+                      , theme:t.Optional[t.List[t.Dict]]=None
+                      , named_entity:t.Optional[t.List[t.Dict]]=None ) -> t.Dict:
+        """
+        :param place, theme, named_entity: the serialized places, themes and named
+            entities, if they are aldready known (see `serialization/serialize_main.py`).
+            if None, they are serialized with `get_place`, `get_theme` and `get_named_entity`.
+        """
         return { "id_uuid"          : self.id_uuid,                      # str
                  "iiif_url"         : self.iiif_url,                     # str
                  "iiif_folio"       : self.iiif_folio,                   # t.List[int] | None
@@ -150,15 +209,17 @@ class Iconography(db.Model):
                  "produced"         : self.produced,                     # bool
                  "represents"       : self.represents,                   # bool
 
-                 "place"            : self.get_place(),                  # t.List[t.Dict]
+                 "place"            : self.get_place() if place is None else place,  # t.List[t.Dict]
                  "institution"      : self.get_institution(),            # t.List[t.Dict]
                  "filename"         : self.get_filename(),               # t.List[t.Dict]
                  "author"           : self.get_author(),                 # t.List[t.Dict]
                  "title"            : self.get_title(),                  # t.List[str]
                  "licence"          : self.licence.serialize_lite(),     # t.Dict
                  "publisher"        : self.get_publisher(),              # t.List[t.Dict]
-                 "theme"            : self.get_theme(),                  # t.List[t.Dict]
-                 "named_entity"     : self.get_named_entity(),           # t.List[t.Dict]
+                 "theme"            : self.get_theme() if theme is None else theme,  # t.List[t.Dict]
+                 "named_entity"     : ( self.get_named_entity()
+                                        if named_entity is None
+                                        else named_entity ),             # t.List[t.Dict]
                  # "admin_person"     : self.get_admin_person()            # t.List[t.Dict]
         }
 
@@ -354,3 +415,5 @@ class Filename(db.Model):
         }
 
 
+from .qualifiers import Title, Actor
+from .relationships import R_IconographyActor
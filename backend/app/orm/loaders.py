@@ -0,0 +1,108 @@
+from sqlalchemy.orm import selectinload, joinedload, raiseload
+import typing as t
+
+from .data_sources import Iconography, Cartography, Directory
+from .qualifiers import Theme, NamedEntity
+from .places import Place
+from .admin import Institution
+from .relationships import ( R_IconographyActor, R_IconographyPlace, R_IconographyTheme
+                           , R_IconographyNamedEntity, R_CartographyPlace, R_AddressPlace
+                           , R_Institution )
+
+
+# -----------------------------------------------------------------
+# loader profiles.
+#
+# all relationships are lazy loaded by default: a related object
+# is only loaded when it is accessed. to avoid 1 query per object,
+# routes attach a loader profile to their queries: a list of loader
+# options that load, in a few queries, exactly the relationships
+# used by the serializer of this route.
+#
+# >>> select(Theme).options(*loader("theme_lite"))
+#
+# see: https://docs.sqlalchemy.org/en/20/orm/queryguide/relationships.html
+# -----------------------------------------------------------------
+
+
+def _cartography_lite() -> t.List:
+    """relationships used by `Cartography.serialize_lite`"""
+    return [ selectinload(Cartography.filename)
+           , selectinload(Cartography.r_cartography_place)
+             .selectinload(R_CartographyPlace.place)
+             .options(*Place.lite_options()) ]
+
+
+def _iconography_main() -> t.List:
+    """
+    relationships used by `Iconography.serialize_full`,
+    except for places, themes and named entities
+    """
+    return [ selectinload(Iconography.title)
+           , selectinload(Iconography.filename)
+           , joinedload(Iconography.licence)
+           , selectinload(Iconography.r_iconography_actor)
+             .joinedload(R_IconographyActor.actor)
+           , selectinload(Iconography.r_institution)
+             .joinedload(R_Institution.institution) ]
+
+
+LOADER_PROFILES = {
+    # only columns of the main table are used: accessing a relationship raises
+    "columns": lambda: [ raiseload("*") ],
+
+    # `Theme.serialize_lite` / `serialize_full`: the iconography count and ids
+    "theme_lite": lambda: [ selectinload(Theme.r_iconography_theme) ],
+
+    # `NamedEntity.serialize_lite` / `serialize_full`: the iconography count and ids
+    "named_entity_lite": lambda: [ selectinload(NamedEntity.r_iconography_named_entity) ],
+
+    # `Place.serialize_lite`
+    "place_lite": lambda: Place.lite_options(),
+
+    # `Place.serialize_full`
+    "place_full": lambda: [ joinedload(Place.place_group)
+                          , selectinload(Place.r_iconography_place)
+                          , selectinload(Place.r_address_place).selectinload(R_AddressPlace.address)
+                          , selectinload(Place.r_cartography_place)
+                            .selectinload(R_CartographyPlace.cartography)
+                            .options(*_cartography_lite()) ],
+
+    # `Cartography.serialize_lite`
+    "cartography_lite": _cartography_lite,
+
+    # `Iconography.serialize_full`
+    "iconography_full": lambda: [ *_iconography_main()
+                                , selectinload(Iconography.r_iconography_place)
+                                  .joinedload(R_IconographyPlace.place)
+                                  .options(*Place.lite_options())
+                                , selectinload(Iconography.r_iconography_theme)
+                                  .joinedload(R_IconographyTheme.theme)
+                                  .selectinload(Theme.r_iconography_theme)
+                                , selectinload(Iconography.r_iconography_named_entity)
+                                  .joinedload(R_IconographyNamedEntity.named_entity)
+                                  .selectinload(NamedEntity.r_iconography_named_entity) ],
+
+    # `Iconography.label`: the titles (links to iconography resources in the public API)
+    "iconography_label": lambda: [ selectinload(Iconography.title) ],
+
+    # `Directory.serialize_lite`
+    "directory_lite": lambda: [ joinedload(Directory.address) ],
+
+    # `Iconography.serialize_full`, when places, themes and named entities
+    # are loaded separately (see `serialization/serialize_main.py`)
+    "iconography_main": _iconography_main,
+
+    # `Institution.serialize_full`
+    "institution_full": lambda: [ selectinload(Institution.r_institution)
+                                  .options( selectinload(R_Institution.cartography).options(*_cartography_lite())
+                                          , selectinload(R_Institution.directory).joinedload(Directory.address) ) ],
+}
+
+
+def loader(profile:str) -> t.List:
+    """
+    return the loader options of a profile in `LOADER_PROFILES`
+    """
+    return LOADER_PROFILES[profile]()
+
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates, selectinload
 from sqlalchemy.dialects import postgresql as psql
 from sqlalchemy import ForeignKey, Text
 from sqlalchemy import select, and_, func
@@ -63,8 +63,7 @@ class Place(db.Model):
                  for r in self.r_address_place ]
 
     def get_iconography(self):
-        return [ r.iconography.serialize_lite()
-                 for r in self.r_iconography_place ]
+        return Iconography.serialize_lite_bulk([ r.id_iconography for r in self.r_iconography_place ])
 
     def get_cartography(self):
         return [ r.cartography.serialize_lite()
@@ -106,15 +105,59 @@ class Place(db.Model):
             .filter( R_IconographyPlace.id_place == self.id )
         ).all()[0][0]
 
-    def serialize_lite(self) -> t.Dict:
-        """object representation of `Place` for the Place index page"""
+    @classmethod
+    def get_iconography_counts(cls, ids:t.List[int]) -> t.Dict[int, int]:
+        """
+        bulk version of `get_iconography_count`: return the number of
+        iconography resources for each place in `ids`, in a single query.
+        places without iconography are not in the output.
+        """
+        r = db.session.execute(
+            select( R_IconographyPlace.id_place, func.count(R_IconographyPlace.id) )
+            .filter( R_IconographyPlace.id_place.in_(ids) )
+            .group_by( R_IconographyPlace.id_place )
+        )
+        return { row[0]: row[1] for row in r.all() }
+
+    @classmethod
+    def lite_options(cls) -> t.List:
+        """
+        loader options to use when querying places that will be passed to
+        `serialize_lite_bulk`: load all relationships used by `serialize_lite`
+        in a few queries, instead of 1 query per place and relationship.
+        """
+        return [ selectinload(cls.r_address_place).selectinload(R_AddressPlace.address)
+               , selectinload(cls.r_cartography_place)
+                 .selectinload(R_CartographyPlace.cartography)
+                 .selectinload(Cartography.filename) ]
+
+    @classmethod
+    def serialize_lite_bulk(cls, places:t.List["Place"]) -> t.List[t.Dict]:
+        """
+        the same as `[ p.serialize_lite() for p in places ]`, but the
+        iconography counts are fetched in a single query.
+        places should be loaded with `Place.lite_options()`.
+        """
+        counts = cls.get_iconography_counts([ p.id for p in places ])
+        return [ p.serialize_lite(iconography_count=counts.get(p.id, 0))
+                 for p in places ]
+
+    def serialize_lite(self, iconography_count:t.Optional[int]=None) -> t.Dict:
+        """
+        object representation of `Place` for the Place index page
+
+        :param iconography_count: the number of iconography resources for this
+                                  place, if it is aldready known (see `serialize_lite_bulk`).
+        """
         return { "id_uuid"           : self.id_uuid,                # str
                  "date"              : int4range2list(self.date),   # t.List[int]
                  "filename"          : self.get_filename_index(),   # t.List[t.Dict]
                  "address"           : self.get_address_index(),    # t.List[t.Dict]
                  "vector"            : self.vector,                 # t.Dict
                  "centroid"          : self.centroid,               # t.Dict
-                 "iconography_count" : self.get_iconography_count() # int
+                 "iconography_count" : ( self.get_iconography_count()
+                                         if iconography_count is None
+                                         else iconography_count )   # int
         }
 
     def serialize_full(self) -> t.Dict:
@@ -234,7 +277,7 @@ class Address(db.Model):
         }
 
 
-from .data_sources import Cartography
+from .data_sources import Cartography, Iconography
 from .relationships import R_AddressPlace, R_CartographyPlace, R_IconographyPlace
 
 
@@ -1,10 +1,9 @@
-from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates, selectinload
 from sqlalchemy import ForeignKey, Text, Boolean, ARRAY, TEXT
 from sqlalchemy.dialects import postgresql as psql
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy import func, select
 import typing as t
-import random
 
 from ..utils.converters import int4range2list
 from ..utils.strings import _validate_uuid
@@ -94,7 +93,7 @@ class Theme(db.Model):
     category_slug : Mapped[str] = mapped_column(Text, nullable=False)
     description   : Mapped[str] = mapped_column(Text, nullable=True)
 
-    r_iconography_theme : Mapped[t.List["R_IconographyTheme"]] = relationship("R_IconographyTheme", back_populates="theme", lazy="selectin")
+    r_iconography_theme : Mapped[t.List["R_IconographyTheme"]] = relationship("R_IconographyTheme", back_populates="theme")
 
     @validates("id_uuid", include_backrefs=False)
     def validate_uuid(self, key, _uuid):
@@ -121,24 +120,31 @@ class Theme(db.Model):
         )
 
     def get_thumbnail(self) -> t.List[str]:
-        """get a thumbnail image for the current theme"""
-        return [[ f.url
-                 for f in random.choice(self.r_iconography_theme)
-                          .iconography.filename
-                 if "thumbnail" in f.url
-               ][0]]  # [0]: keep only the 1st thumbnail
+        """
+        get a thumbnail image for the current theme. thumbnails are
+        precomputed for all themes, see `app/caching/cache_thumbnails.py`
+        """
+        # imported here to avoid a circular import: `cache_thumbnails` imports the ORM
+        from ..caching.cache_thumbnails import get_thumbnails
+        url = get_thumbnails(self.__tablename__).get(self.id, None)
+        return [ url ] if url is not None else []
 
     def get_iconography(self):
-        return [ r.iconography.serialize_lite()
-                 for r in self.r_iconography_theme ]
+        return Iconography.serialize_lite_bulk([ r.id_iconography for r in self.r_iconography_theme ])
 
-    def serialize_lite(self):
+    def serialize_lite(self, iconography_count:t.Optional[int]=None):
+        """
+        :param iconography_count: the number of iconography resources for this
+                                  row, if it is aldready known (see `serialization/serialize_main.py`).
+        """
         return { "id_uuid": self.id_uuid,                     # str
                  "entry_name": self.entry_name,               # str
                  "category_name": self.category,                   # str
                  "category_slug": self.category_slug,         # str
                  "thumbnail": self.get_thumbnail(),           # t.List[str]
-                 "iconography_count": self.iconography_count  # int
+                 "iconography_count": ( self.iconography_count
+                                        if iconography_count is None
+                                        else iconography_count )  # int
         }
 
     def serialize_full(self):
@@ -202,6 +208,7 @@ class Theme(db.Model):
         return all themes where theme.category_slug == category_slug
         """
         query = (select(Theme)
+                .options(selectinload(Theme.r_iconography_theme))  # see the `theme_lite` profile in `loaders.py`
                 .filter(Theme.category_slug==category_slug)
                 .order_by(Theme.entry_name))
         r = db.session.execute(query).all()
@@ -225,7 +232,7 @@ class NamedEntity(db.Model):
     category_slug : Mapped[str] = mapped_column(Text, nullable=False)
     description   : Mapped[str] = mapped_column(Text, nullable=True)
 
-    r_iconography_named_entity : Mapped[t.List["R_IconographyNamedEntity"]] = relationship("R_IconographyNamedEntity", back_populates="named_entity", lazy="selectin")
+    r_iconography_named_entity : Mapped[t.List["R_IconographyNamedEntity"]] = relationship("R_IconographyNamedEntity", back_populates="named_entity")
 
     @validates("id_uuid", include_backrefs=False)
     def validate_uuid(self, key, _uuid):
@@ -254,25 +261,29 @@ class NamedEntity(db.Model):
         """
         get a thumbnail image for the current named entity.
         returns a list with 1 string in it: the thumbnail's filename
+        (or an empty list if no iconography has a thumbnail).
+        see `Theme.get_thumbnail`
         """
-        return [[ f.url
-                 for f in random.choice(self.r_iconography_named_entity)
-                          .iconography
-                          .filename
-                 if "thumbnail" in f.url
-               ][0]]  # [0]: keep only the 1st element.
+        from ..caching.cache_thumbnails import get_thumbnails
+        url = get_thumbnails(self.__tablename__).get(self.id, None)
+        return [ url ] if url is not None else []
 
     def get_iconography(self):
-        return [ r.iconography.serialize_lite()
-                 for r in self.r_iconography_named_entity ]
+        return Iconography.serialize_lite_bulk([ r.id_iconography for r in self.r_iconography_named_entity ])
 
-    def serialize_lite(self):
+    def serialize_lite(self, iconography_count:t.Optional[int]=None):
+        """
+        :param iconography_count: the number of iconography resources for this
+                                  row, if it is aldready known (see `serialization/serialize_main.py`).
+        """
         return { "id_uuid": self.id_uuid,                     # str
                  "entry_name": self.entry_name,               # str
                  "category_name": self.category,                   # str
                  "category_slug": self.category_slug,         # str
                  "thumbnail": self.get_thumbnail(),           # t.List[str]
-                 "iconography_count": self.iconography_count  # int
+                 "iconography_count": ( self.iconography_count
+                                        if iconography_count is None
+                                        else iconography_count )  # int
         }
 
     def serialize_full(self):
@@ -340,6 +351,7 @@ class NamedEntity(db.Model):
         return all named entities where `named_entity.category_slug==category_slug`
         """
         query = (select(NamedEntity)
+                .options(selectinload(NamedEntity.r_iconography_named_entity))  # see the `named_entity_lite` profile in `loaders.py`
                 .filter(NamedEntity.category_slug==category_slug)
                 .order_by(NamedEntity.entry_name))
         r = db.session.execute(query).all()
@@ -372,14 +384,14 @@ class Actor(db.Model):
         return self.entry_name
 
     def get_iconography_author(self):
-        return [ r.iconography.serialize_lite()
-                 for r in self.r_iconography_actor
-                 if r.role == "author" ]
+        return Iconography.serialize_lite_bulk([ r.id_iconography
+                                                 for r in self.r_iconography_actor
+                                                 if r.role == "author" ])
 
     def get_iconography_publisher(self):
-        return [ r.iconography.serialize_lite()
-                 for r in self.r_iconography_actor
-                 if r.role == "publisher" ]
+        return Iconography.serialize_lite_bulk([ r.id_iconography
+                                                 for r in self.r_iconography_actor
+                                                 if r.role == "publisher" ])
 
     def serialize_lite(self):
         return { "id_uuid": self.id_uuid,
@@ -393,3 +405,4 @@ class Actor(db.Model):
 
 
 from .relationships import R_IconographyNamedEntity, R_IconographyTheme
+from .data_sources import Iconography
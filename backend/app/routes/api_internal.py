@@ -8,50 +8,54 @@ from flask_cors import cross_origin
 from sqlalchemy import text, func
 from sqlalchemy.sql.expression import bindparam
 
-from ..search.search_iconography import sanitize_params, make_params, make_query
+from ..search.search_iconography import sanitize_params, make_params, search_ids, search_page
 from ..search.search_quicksearch import quick_search
+from ..search.search_typeahead import typeahead, LIMIT_DEFAULT, LIMIT_MAX
 from ..utils.spatial import featurelist_to_featurecollection, geometry_to_feature
-from ..app import app, db, cache
+from ..serialization import serialize_sql, serialize_main
+from ..serialization.serialize_columnar import listing
+from ..caching.cache_routes import cached_route, cached_query, cached_listing
+from ..caching.cache_version import get_data_version
+from ..app import app, db
 from ..orm import *
+from ..orm.loaders import loader
 
-# WARNING: ROUTES PASSING PARAMETERS AS QUERY STRINGS MUST NOT BE CACHED
-# (CACHING DOES NOT TAKE INTO ACCOUNT THE QUERY)
+# WARNING: DON'T USE `@cache.cached()`: ITS KEYS DON'T CONTAIN THE DATA VERSION.
+# `@cached_route()` DOES NOT TAKE INTO ACCOUNT THE QUERY STRING OR BODY:
+# ROUTES PASSING PARAMETERS AS QUERY STRINGS OR JSON MUST USE `@cached_query()`
+# ROUTES RETURNING `listing()` MUST USE `@cached_listing()`
 
 # *************************************************************************
 # iconography
 # *************************************************************************
 
 @app.route("/i/iconography")
-@cache.cached()
+@cached_listing()
 def index_iconography():
     """
     get all `iconography` ressources.
-    we mimic `flask.jsonify` with `Response` because
-    the json isn't sent to the client using `jsonify`
+    with `?format=columnar`, the authors are dictionary-encoded
+    (see `serialization/serialize_columnar.py`).
     """
-    r = db.session.execute(Iconography.query)
-    return jsonify([ _[0].serialize_lite() for _ in r.all() ])
+    if app.config.get("SERIALIZATION_ENGINE", "orm") == "sql":
+        return listing(serialize_sql.iconography_lite(), dictionary=["authors"])
+    ids = db.session.execute(select(Iconography.id)).scalars().all()
+    return listing(Iconography.serialize_lite_bulk(ids), dictionary=["authors"])
 
 
 @app.route("/i/iconography/<id_uuid>")
-@cache.cached()
+@cached_route()
 def main_iconography(id_uuid):
-    """return an `Iconography` object based on its `id_uuid`"""
-    r = db.session.execute(Iconography
-                           .query
-                           .filter(Iconography.id_uuid == id_uuid))
-    out = [ _[0].serialize_full() for _ in r.all() ]
-    for icono in out:
-        # avec des boucles inline
-        icono["place"] = [ geometry_to_feature( place["vector"]
-                                              , custom_properties={"id_uuid": place["id_uuid"]} )
-                           for place in icono["place"] ]
-        icono["place"] = featurelist_to_featurecollection(icono["place"])
-
-    return jsonify(out)
+    """
+    return an `Iconography` object based on its `id_uuid`,
+    with its places as a geojson FeatureCollection
+    (see `serialization/serialize_main.py`)
+    """
+    return jsonify(serialize_main.iconography_main(id_uuid))
 
 
 @app.route("/i/iconography/from-uuid")
+@cached_query()
 def iconography_from_uuid():
     """
     return Iconography objects matching the UUIDs in `id_uuid_arr`.
@@ -61,7 +65,9 @@ def iconography_from_uuid():
     out = []
 
     if len(id_uuid_arr):
-        query = select( Iconography ).filter( Iconography.id_uuid.in_(id_uuid_arr) )
+        query = ( select( Iconography )
+                  .options( *loader("iconography_full") )
+                  .filter( Iconography.id_uuid.in_(id_uuid_arr) ) )
         r = db.session.execute( query ).all()
         out = [ icono[0].serialize_full() for icono in r ]
 
@@ -70,13 +76,16 @@ def iconography_from_uuid():
 
 @app.route("/i/iconography/from-uuid/full", methods=["POST"])
 @cross_origin()
+@cached_query()
 def iconography_from_uuid_full():
     """
     receives an array of iconography.id_uuid from the request body and
     returns an array of Iconography.serialize_full() objects
     """
     id_uuid_list = request.get_json()
-    r = db.session.execute(select(Iconography).filter(Iconography.id_uuid.in_(id_uuid_list)))
+    r = db.session.execute(select(Iconography)
+                           .options(*loader("iconography_full"))
+                           .filter(Iconography.id_uuid.in_(id_uuid_list)))
     return jsonify([ row[0].serialize_full() for row in r.all() ]);
 
 
@@ -109,7 +118,7 @@ def iconography_overall_date_range():
 # *************************************************************************
 
 @app.route("/i/theme")
-# @cache.cached()  # no cache since `preview` is in the query string
+@cached_query()
 def index_theme():
     """
     return an index of theme categories.
@@ -124,29 +133,34 @@ def index_theme():
 
 
 @app.route("/i/theme/category/<string:category_slug>")
-@cache.cached()
+@cached_listing()
 def themes_for_category(category_slug:str):
     """
-    return all themes within a category, or all themes if `category_slug=="all"`
+    return all themes within a category, or all themes if `category_slug=="all"`.
+    with `?format=columnar`, the categories are dictionary-encoded.
     """
-    if category_slug == "all":
+    if category_slug == "all" and app.config.get("SERIALIZATION_ENGINE", "orm") == "sql":
+        out = serialize_sql.theme_lite()
+    elif category_slug == "all":
         out = [ t[0].serialize_lite()
-                for t in db.session.execute(Theme.query).all() ]
+                for t in db.session.execute(select(Theme).options(*loader("theme_lite"))).all() ]
     else:
         out = Theme.get_themes_for_category(category_slug)
-    return jsonify(out)
+    return listing(out, dictionary=["category_name", "category_slug"])
 
 
 @app.route("/i/theme/<string:id_uuid>")
-@cache.cached()
+@cached_route()
 def main_theme(id_uuid:str):
     """fetch all iconographic resources related to a theme"""
-    r = db.session.execute(Theme.query.filter( Theme.id_uuid == id_uuid ))
+    r = db.session.execute(select(Theme)
+                           .options(*loader("theme_lite"))
+                           .filter( Theme.id_uuid == id_uuid ))
     return jsonify([ t[0].serialize_full() for t in r.all() ])
 
 
 @app.route("/i/theme/tree/<string:category_slug>")
-@cache.cached()
+@cached_route()
 def theme_category_tree(category_slug:str):
     """
     returns a tree view of themes.
@@ -177,16 +191,18 @@ def theme_category_tree(category_slug:str):
 
 
 @app.route("/i/theme/name/<id_uuid>")
-@cache.cached()
+@cached_route()
 def main_theme_name(id_uuid:str):
     """
     get the name of a theme from its UUID. used in the main page for a theme.
     """
-    r = db.session.execute(Theme.query.filter( Theme.id_uuid == id_uuid ))
+    r = db.session.execute(select(Theme)
+                           .options(*loader("columns"))
+                           .filter( Theme.id_uuid == id_uuid ))
     return jsonify([ t[0].entry_name for t in r.all() ])
 
 @app.route("/i/theme/category/name/all")
-@cache.cached()
+@cached_route()
 def theme_category_name_all():
     """
     :returns: an array of all allowed categories
@@ -194,6 +210,7 @@ def theme_category_name_all():
                 category_slug: theme.category_slug } ]
     """
     r = db.session.execute(select( Theme )
+                          .options( *loader("columns") )
                           .distinct( Theme.category, Theme.category_slug ))
     return jsonify([ { "category_name": row[0].category,
                        "category_slug": row[0].category_slug }
@@ -201,7 +218,7 @@ def theme_category_name_all():
 
 
 @app.route("/i/theme/category/name/<string:category_slug>")
-@cache.cached()
+@cached_route()
 def theme_category_name(category_slug:str):
     """
     returns as a string the category name corresponding to a category_slug
@@ -223,7 +240,7 @@ def theme_category_name(category_slug:str):
 
 
 @app.route("/i/named-entity")
-# @cache.cached()  # no cache since `preview` is in the query string
+@cached_query()
 def index_named_entity():
     """
     return an index of named_entity categories.
@@ -238,32 +255,35 @@ def index_named_entity():
 
 
 @app.route("/i/named-entity/category/<string:category_slug>")
-@cache.cached()
+@cached_listing()
 def named_entities_for_category(category_slug:str):
     """
     return all named entities within a category,
-    or all named entities if `category_slug=="all"`
+    or all named entities if `category_slug=="all"`.
+    with `?format=columnar`, the categories are dictionary-encoded.
     """
     if category_slug == "all":
         out = [ ne[0].serialize_lite()
-                for ne in db.session.execute(NamedEntity.query).all() ]
+                for ne in db.session.execute(select(NamedEntity).options(*loader("named_entity_lite"))).all() ]
     else:
         out = NamedEntity.get_named_entities_for_category(category_slug)
-    return jsonify(out)
+    return listing(out, dictionary=["category_name", "category_slug"])
 
 
 @app.route("/i/named-entity/<id_uuid>")
-@cache.cached()
+@cached_route()
 def main_named_entity(id_uuid:str):
     """
     fetch all iconographic resources related to a named entity.
     """
-    r = db.session.execute(NamedEntity.query.filter( NamedEntity.id_uuid==id_uuid ))
+    r = db.session.execute(select(NamedEntity)
+                           .options(*loader("named_entity_lite"))
+                           .filter( NamedEntity.id_uuid==id_uuid ))
     return jsonify([ n[0].serialize_full() for n in r.all() ])
 
 
 @app.route("/i/named-entity/tree/<string:category_slug>")
-@cache.cached()
+@cached_route()
 def named_entity_category_tree(category_slug:str):
     """
     returns a tree view of named entities.
@@ -294,18 +314,20 @@ def named_entity_category_tree(category_slug:str):
 
 
 @app.route("/i/named-entity/name/<id_uuid>")
-@cache.cached()
+@cached_route()
 def main_named_entity_name(id_uuid:str):
     """
     get the name of a named entity from its UUID
     used in the main pages for a named entity.
     """
-    r = db.session.execute(NamedEntity.query.filter( NamedEntity.id_uuid == id_uuid ))
+    r = db.session.execute(select(NamedEntity)
+                           .options(*loader("columns"))
+                           .filter( NamedEntity.id_uuid == id_uuid ))
     return jsonify([ n[0].entry_name for n in r.all() ])
 
 
 @app.route("/i/named-entity/category/name/all")
-@cache.cached()
+@cached_route()
 def named_entity_category_name_all():
     """
     :returns: an array of all allowed categories
@@ -313,6 +335,7 @@ def named_entity_category_name_all():
                 category_slug: named_entity.category_slug } ]
     """
     r = db.session.execute(select( NamedEntity )
+                          .options( *loader("columns") )
                           .distinct( NamedEntity.category, NamedEntity.category_slug ))
     return jsonify([ { "category_name": row[0].category,
                        "category_slug": row[0].category_slug }
@@ -320,7 +343,7 @@ def named_entity_category_name_all():
 
 
 @app.route("/i/named-entity/category/name/<string:category_slug>")
-@cache.cached()
+@cached_route()
 def named_entity_category_name(category_slug:str):
     """
     returns as a string the category name corresponding to a category_slug
@@ -354,7 +377,7 @@ def named_entity_category_name(category_slug:str):
 # *************************************************************************
 
 @app.route("/i/institution")
-@cache.cached()
+@cached_route()
 def institution():
     """
     get all institution elements
@@ -403,16 +426,18 @@ def institution():
 
 
 @app.route("/i/institution/<string:id_uuid>")
-@cache.cached()
+@cached_route()
 def main_institution(id_uuid: str):
     """
     return data for a specific institution
     """
-    r = db.session.execute(select(Institution).filter(Institution.id_uuid == id_uuid))
+    r = db.session.execute(select(Institution)
+                           .options(*loader("institution_full"))
+                           .filter(Institution.id_uuid == id_uuid))
     return jsonify([ i[0].serialize_full() for i in r.all() ])
 
 @app.route("/i/institution/name/<string:id_uuid>")
-@cache.cached()
+@cached_route()
 def main_institution_name(id_uuid:str):
     """
     get the name of an institution from its UUID
@@ -428,40 +453,50 @@ def main_institution_name(id_uuid:str):
 # *************************************************************************
 
 @app.route("/i/place")
-@cache.cached()
+@cached_listing()
 def index_place():
     """
-    get all `place` ressources
+    get all `place` ressources.
+    with `?format=columnar`, the filenames of the cartographic
+    sources are dictionary-encoded.
     """
-    r = db.session.execute(Place.query)
-    return jsonify([ _[0].serialize_lite() for _ in r.all() ])
+    if app.config.get("SERIALIZATION_ENGINE", "orm") == "sql":
+        return listing(serialize_sql.place_lite(), dictionary=["filename"])
+    places = db.session.execute(select(Place).options(*Place.lite_options())).scalars().all()
+    return listing(Place.serialize_lite_bulk(places), dictionary=["filename"])
 
 @app.route("/i/place/<string:id_uuid>")
-@cache.cached()
+@cached_route()
 def place_main(id_uuid:str):
     """
     fetch a place from its `id_uuid` and return all iconography.
     """
-    r = db.session.execute(select(Place).filter(Place.id_uuid == id_uuid))
+    r = db.session.execute(select(Place)
+                           .options(*loader("place_full"))
+                           .filter(Place.id_uuid == id_uuid))
     return jsonify([ _[0].serialize_full() for _ in r.all() ])
 
 
 @app.route("/i/place/lite/<string:place_uuid>")
-@cache.cached()
+@cached_route()
 def place_lite(place_uuid:str):
     """
     get a single `place` item and return its `serialize_lite()` repr
     """
-    r = db.session.execute(Place.query.filter(Place.id_uuid==place_uuid).limit(1))
+    r = db.session.execute(select(Place)
+                           .options(*loader("place_lite"))
+                           .filter(Place.id_uuid==place_uuid)
+                           .limit(1))
     return jsonify([ _[0].serialize_lite() for _ in r.all() ])
 
 @app.route("/i/place/address/<string:id_uuid>")
-@cache.cached()
+@cached_route()
 def place_address(id_uuid):
     """
     get an address for a place based on this place's `id_uuid`
     """
     r = db.session.execute(select( Address )
+                          .options( *loader("columns") )
                           .join( Address.r_address_place )
                           .join( R_AddressPlace.place )
                           .filter( Place.id_uuid == id_uuid )
@@ -478,7 +513,7 @@ def index_directory():
     """
     get all directory ressources. currently unused (?)
     """
-    r = db.session.execute(Directory.query)
+    r = db.session.execute(select(Directory).options(*loader("directory_lite")))
     return jsonify([ _[0].serialize_lite() for _ in r.all() ])
 
 
@@ -487,13 +522,16 @@ def index_directory():
 # *************************************************************************
 
 @app.route("/i/cartography-main/places")
-@cache.cached()
+@cached_route()
 def cartography_places():
     """
     get all places and return them as a geojson FeatureCollection
     """
-    places = [ p[0].serialize_lite()
-               for p in db.session.execute( Place.query ).all() ]
+    if app.config.get("SERIALIZATION_ENGINE", "orm") == "sql":
+        places = serialize_sql.place_lite()
+    else:
+        places = Place.serialize_lite_bulk(
+            db.session.execute( select(Place).options(*Place.lite_options()) ).scalars().all() )
     places = [ geometry_to_feature( geometry=p["vector"]
                                   , custom_properties={
                                       "address"           : p["address"],
@@ -505,6 +543,7 @@ def cartography_places():
     return jsonify(places)
 
 @app.route("/i/cartography-main/cartography/source")
+@cached_route()
 def cartography_sources():
     """
     get a list of all distinct Cartography.map_source
@@ -518,18 +557,22 @@ def cartography_sources():
 
 
 @app.route("/i/cartography-main/cartography/source/<string:cartography_source>")
-@cache.cached()
+@cached_listing()
 def cartography_for_source(cartography_source:str):
     """
-    return a list of Cartography objects with Cartography.map_source == cartography_source
+    return a list of Cartography objects with Cartography.map_source == cartography_source.
+    with `?format=columnar`, the sources and places are dictionary-encoded.
     """
     r = (db.session
-        .execute( select(Cartography).filter(Cartography.map_source == cartography_source) )
+        .execute( select(Cartography)
+                  .options(*loader("cartography_lite"))
+                  .filter(Cartography.map_source == cartography_source) )
         .all())
-    return jsonify([ c[0].serialize_lite() for c in r ])
+    return listing([ c[0].serialize_lite() for c in r ], dictionary=["map_source", "place"])
 
 
 @app.route("/i/cartography-main/cartography/granularity")
+@cached_route()
 def cartography_granularity():
     """
     get a list of all distinct `Cartography.granularity` values
@@ -542,15 +585,18 @@ def cartography_granularity():
     return jsonify(gran)
 
 @app.route("/i/cartography-main/cartography/granularity/<string:cartography_granularity>")
-@cache.cached()
+@cached_listing()
 def cartography_for_granularity(cartography_granularity: str):
     """
-    get all cartography sources for a certain granularity
+    get all cartography sources for a certain granularity.
+    with `?format=columnar`, the sources and places are dictionary-encoded.
     """
     r = (db.session
-        .execute( select(Cartography).filter(Cartography.granularity == cartography_granularity) )
+        .execute( select(Cartography)
+                  .options(*loader("cartography_lite"))
+                  .filter(Cartography.granularity == cartography_granularity) )
         .all() )
-    return jsonify([ c[0].serialize_lite() for c in r ])
+    return listing([ c[0].serialize_lite() for c in r ], dictionary=["map_source", "place"])
 
 
 # *************************************************************************
@@ -572,6 +618,11 @@ def advanced_search_iconography():
     * `dateFilter`  :
     * `date[]`      :
 
+    to paginate the results, pass `limit` (and optionally `offset`)
+    in the query string. the response is then:
+    `{ total: int, limit: int, offset: int, results: [ <iconography> ] }`,
+    where `total` is the number of results of the search. without `limit`,
+    the route returns the list of all results.
     """
     if request.method == "POST" and request.is_json:
         results = []
@@ -581,8 +632,17 @@ def advanced_search_iconography():
         params, valid = sanitize_params(params)
         if not valid:
             return "Internal server error at `sanitize_params`", 500
-        results = make_query(params).all()
-        return jsonify([ r[0].serialize_lite() for r in results ])
+        if "limit" in request.args:
+            limit = request.args.get("limit", None, type=int)
+            offset = request.args.get("offset", type=int) if "offset" in request.args else 0
+            if limit is None or limit < 1 or offset is None or offset < 0:
+                return "Invalid `limit` or `offset`: expected integers, with `limit` > 0 and `offset` >= 0", 400
+            total, ids = search_page(params, limit, offset)
+            return jsonify({ "total"  : total,
+                             "limit"  : limit,
+                             "offset" : offset,
+                             "results": Iconography.serialize_lite_bulk(ids) })
+        return jsonify(Iconography.serialize_lite_bulk(search_ids(params)))
     else:
         return "This route only accepts HTTP with JSON parameters", 400
 
@@ -598,6 +658,34 @@ def search_quicksearch(query_string:str):
     out = quick_search(query_string)
     return jsonify(out) if len(out) else jsonify([])
 
+@app.route("/i/search/typeahead/<string:query_string>", methods=["GET"])
+def search_typeahead(query_string:str):
+    """
+    run a quicksearch in typeahead mode: return the best results of each
+    table, with the number of results per table (see `../search/search_typeahead.py`).
+
+    allowed query parameters:
+    * `limit`  : the max number of results per table (default: 5, max: 50)
+    * `table`  : only search this table ("show more")
+    * `cursor` : the `cursor` of a previous response, to get the next results of `table`
+
+    :returns:
+        { <table name>: { total: int,
+                          results: [ { table_name: str, id_uuid: str, entry_name: str } ],
+                          cursor: str|None } }
+    """
+    limit = request.args.get("limit", None, type=int) if "limit" in request.args else LIMIT_DEFAULT
+    if limit is None:
+        return f"Invalid `limit`: expected an integer between 1 and {LIMIT_MAX}, got `{request.args['limit']}`", 400
+    try:
+        out = typeahead( query_string
+                       , limit=limit
+                       , table=request.args.get("table", None)
+                       , cursor=request.args.get("cursor", None) )
+    except ValueError as e:
+        return str(e), 400
+    return jsonify(out)
+
 # *************************************************************************
 # associations
 # *************************************************************************
@@ -858,6 +946,7 @@ def association_place_from_place(id_uuid:str):
 
 
 @app.route("/i/association/index")
+@cached_query()
 def association_index():
     """
     build an index of `iconography` resources where
@@ -957,13 +1046,12 @@ def association_index():
         elif params["to_table"] == "named_entity":
             base_query = by_named_entity(base_query, params["to_id_uuid"])
 
-    query = select( Iconography ).filter( Iconography.id.in_(base_query) )
-    r = db.session.execute( query )
+    ids = db.session.execute( base_query ).scalars().all()
 
     # import sqlparse
-    # print(sqlparse.format(str(query), keyword_case="upper", reindent=True))
+    # print(sqlparse.format(str(base_query), keyword_case="upper", reindent=True))
 
-    return [ i[0].serialize_lite() for i in r.all() ]
+    return Iconography.serialize_lite_bulk(ids)
 
 # *************************************************************************
 # other
@@ -987,6 +1075,16 @@ def dbcounts():
     return { row[0] : row[1] for row in r }
 
 
+@app.route("/i/cache/version", methods=["GET"])
+def cache_version():
+    """
+    return the current data version, used in all cache keys.
+    the version is only recomputed from the command line (`flask ... cache-bump-version`):
+    this route is public, and a recomputation invalidates the whole cache.
+    """
+    return jsonify({ "data_version": get_data_version() })
+
+
 # *************************************************************************
 
 # @app.route("/i/raise")
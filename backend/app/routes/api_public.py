@@ -2,12 +2,13 @@ from typing import Optional
 from enum import Enum
 from functools import cached_property
 
-from flask import jsonify
+from flask import jsonify, current_app
 from flask_openapi3 import Tag
 
 from pydantic import BaseModel, Field
 
-from sqlalchemy.orm import class_mapper
+from sqlalchemy.orm import class_mapper, selectinload, joinedload
+from sqlalchemy import select
 from sqlalchemy.exc import NoResultFound
 
 from ..app import db
@@ -41,8 +42,9 @@ from ..orm.admin import (
 
 
 from .to_pydantic import sqlalchemy_to_pydantic, RelatedEntity
+from ..orm.loaders import loader
 
-from ..search.search_iconography import make_query, sanitize_params
+from ..search.search_iconography import make_query, sanitize_params, search_page
 
 
 # *************************************************
@@ -52,6 +54,10 @@ from ..search.search_iconography import make_query, sanitize_params
 
 QUERY_COL_SEP = ","
 
+# relationships used by the `label` property of a table, which must be
+# loaded with the linked entities (see `Resource.loader_options`)
+LABEL_RELATIONSHIPS = { "Iconography": [ "title" ] }
+
 
 class PaginationParameters(BaseModel):
     """Paramètres pour les routes fournisant de la pagination"""
@@ -86,6 +92,8 @@ class SearchParameters(BaseModel):
     institution_boolean_op: BooleanEnum = Field(default=BooleanEnum.and_selection, description="opérateur de sélection pour les institutions")
     date: Optional[str] | None = Field(default="", description="sélection d'une date ou d'un intervalle de date")
     date_boolean_op: BooleanEnum = Field(default=BooleanEnum.and_selection, description="opérateur de sélection des dates")
+    limit: Optional[int] | None = Field(default=None, ge=1, description="nombre maximum d'iconographies par page. si absent, toutes les iconographies sont renvoyées")
+    offset: Optional[int] | None = Field(default=0, ge=0, description="nombre d'iconographies à ignorer (avec `limit`)")
 
 
 class ResourceNotFoundResponse(BaseModel):
@@ -145,6 +153,39 @@ class Resource:
     def api_model_lite(self):
         return sqlalchemy_to_pydantic(self.orm_model, self.ui_name, self.excluded_relations, lite=True)
 
+    @cached_property
+    def loader_options(self):
+        """
+        loader options to load all the entities linked to a page of
+        objects (see `_serialize_relationships`) with 1 or 2 queries
+        per relationship, instead of 1 query per object and relationship.
+
+        for relationships to an association table (`self.join_relations`),
+        the association rows are loaded with the entities they link to.
+        """
+        options = []
+        for relation in self.relationships:
+            rel_name = relation.key
+            if rel_name in self.excluded_relations:
+                continue
+            if relation.uselist:
+                option = selectinload(relation.class_attribute)
+            else:
+                option = joinedload(relation.class_attribute)
+            target = relation.mapper
+            if rel_name in self.join_relations:
+                attr_name = self.join_relations[rel_name][0]
+                if attr_name not in relation.mapper.relationships:
+                    options.append(option)
+                    continue
+                option = option.joinedload(getattr(relation.mapper.class_, attr_name))
+                target = relation.mapper.relationships[attr_name].mapper
+            options.append(option.options(*[
+                selectinload(getattr(target.class_, label_rel))
+                for label_rel in LABEL_RELATIONSHIPS.get(target.class_.__name__, [])
+            ]))
+        return options
+
     def _add_linked_entity(self, target_route, target):
         return {
             "api_route": f"/api/v1/{target_route}",
@@ -180,7 +221,16 @@ class Resource:
                 else:
                     output[rel_name] = None
 
-    def serialize(self, obj, lite=False):
+    def serialize(self, obj, lite=False, validate=None):
+        """
+        serialize `obj` for the public API.
+
+        the output is validated against the pydantic model of the
+        resource only if `validate` is True. by default, `validate`
+        is `API_VALIDATE_OUTPUT` in the config: validation runs in
+        dev/tests, while in production the dict is returned as is
+        (the dict and the validated model have the same shape).
+        """
         output = {}
         api_model = self.api_model_lite
         for attr in self.columns:
@@ -206,25 +256,31 @@ class Resource:
             self._serialize_relationships(obj, output)
             api_model = self.api_model
 
-        obj = api_model(**output)  # output format validation
-        return obj.dict()
+        if validate is None:
+            validate = current_app.config.get("API_VALIDATE_OUTPUT", True)
+        if validate:
+            obj = api_model(**output)  # output format validation
+            return obj.dict()
+        return output
 
     def serialize_as_link(self, obj):
         link = RelatedEntity(api_route=f"/api/v1/{self.name}", id_uuid=obj.id_uuid, label=obj.label)
         return link.dict()
 
     def get_paginate(self, query: PaginationParameters):
-        page = db.paginate(self.orm_model.query, page=query.page, per_page=query.limit)
+        page = db.paginate(self.orm_model.query.options(*self.loader_options), page=query.page, per_page=query.limit)
         return jsonify([self.serialize(obj) for obj in page])
 
     def get_entity(self, query: EntityParameters):
         r = db.session.execute(
-            self.orm_model.query.filter(self.orm_model.id_uuid == query.id_uuid)
+            self.orm_model.query
+            .options(*self.loader_options)
+            .filter(self.orm_model.id_uuid == query.id_uuid)
         )
         return jsonify(self.serialize(r.one()[0]))
 
     def get_entity_lite(self, query: PaginationParameters):
-        page = db.paginate(self.orm_model.query, page=query.page, per_page=query.limit)
+        page = db.paginate(self.orm_model.query.options(*loader("columns")), page=query.page, per_page=query.limit)
         return jsonify([self.serialize(obj, lite=True) for obj in page])
 
 
@@ -368,9 +424,25 @@ ICONOGRAPHY_RESOURCE = IconographyResource()
 def search(query: SearchParameters):
     """
     search resource.
+    with `limit` (and optionally `offset`), the results are paginated:
+    `{ total: int, limit: int, offset: int, results: [ <link> ] }`.
     """
-    query_dump = sanitize_search_query(query.model_dump())
-    results = make_query(query_dump).all()
+    query_dump = query.model_dump()
+    limit, offset = query_dump.pop("limit"), query_dump.pop("offset") or 0
+    query_dump = sanitize_search_query(query_dump)
+    if limit is not None:
+        total, ids = search_page(query_dump, limit, offset)
+        if not total:
+            return ResourceNotFoundResponse().dict(), 404
+        r = db.session.execute(select(Iconography)
+                               .options(*loader("iconography_label"))
+                               .filter(Iconography.id.in_(ids))
+                               .order_by(Iconography.id))
+        return jsonify({ "total"  : total,
+                         "limit"  : limit,
+                         "offset" : offset,
+                         "results": [ ICONOGRAPHY_RESOURCE.serialize_as_link(i) for i in r.scalars().all() ] })
+    results = make_query(query_dump, options=loader("iconography_label")).all()
     data = [ICONOGRAPHY_RESOURCE.serialize_as_link(r[0]) for r in results]
     if not data:
         return ResourceNotFoundResponse().dict(), 404
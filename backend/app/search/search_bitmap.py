@@ -0,0 +1,307 @@
+"""
+in-memory engine for the advanced search on iconography
+(`SEARCH_ENGINE = "bitmap"` in the config).
+
+`build_query` (`search_iconography.py`) translates the search parameters
+into joins, `NOT IN` subqueries and an `UNION`, which are run by postgres
+on every search. here, each worker keeps posting lists of `Iconography.id`
+as bitmaps (python integers, where bit `n` is set if iconography `n` is in
+the list), and evaluates the same `and`/`or`/`not` logic with bitwise
+operations:
+
+- per theme, named entity and institution name
+- per actor and role ("author", "publisher")
+- per decade, for the date filters (ids whose date range touches
+  the decade, starts in the decade or ends in the decade)
+
+only the ILIKE filters (title, author, publisher) need the database:
+the titles and actors matching the patterns are fetched with SQL, and
+their iconography ids or posting lists are combined in memory.
+
+the output is the same as `build_query`, including its quirks (see
+`evaluate`). the index is rebuilt when the data version changes.
+"""
+from psycopg2.extras import NumericRange
+from sqlalchemy import select
+from sqlalchemy.sql.expression import any_
+import threading
+import typing as t
+
+from ..orm import ( Iconography, Title, Actor, Theme, NamedEntity
+                  , Institution, R_Institution, R_IconographyActor
+                  , R_IconographyNamedEntity, R_IconographyTheme )
+from ..caching.cache_version import get_data_version
+from ..app import app, db
+
+
+Bounds = t.Tuple[t.Optional[int], t.Optional[int]]  # ( <lower bound, included>, <upper bound, excluded> ). None if infinite
+
+
+# *********************************************
+# bitmaps
+
+def from_ids(ids:t.Iterable[int]) -> int:
+    """build a bitmap from positive integers"""
+    ids = list(ids)
+    if not len(ids):
+        return 0
+    buf = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def to_ids(bitmap:int) -> t.List[int]:
+    """the sorted list of integers in `bitmap`"""
+    bits = bin(bitmap)[:1:-1]  # reversed, without the `0b` prefix: bits[n] is bit n
+    return [ n for n, b in enumerate(bits) if b == "1" ]
+
+
+def union_all(bitmaps:t.Iterable[int]) -> int:
+    out = 0
+    for b in bitmaps:
+        out |= b
+    return out
+
+
+# *********************************************
+# index
+
+class BitmapIndex:
+    """
+    posting lists of `Iconography.id`, as bitmaps.
+
+    - `all`          : all iconography resources
+    - `theme`        : { <theme name>: <bitmap> }
+    - `named_entity` : { <named entity name>: <bitmap> }
+    - `institution`  : { <institution name>: <bitmap> }
+    - `actor`        : { <role>: { <actor id>: <bitmap> } }
+    - `bounds`       : { <iconography id>: <bounds of the date> }, for non-empty dates
+    - `date_touches` : { <decade>: <ids whose date range touches the decade> }
+    - `date_lower`   : { <decade>: <ids whose lower bound is in the decade> }
+    - `date_upper`   : { <decade>: <ids whose upper bound is in the decade> }
+    - `date_infinite`: ids of the dates with an infinite bound (not in `date_touches`)
+    """
+    def __init__(self, version:str):
+        self.version = version
+        self.all = 0
+        self.theme: t.Dict[str, int] = {}
+        self.named_entity: t.Dict[str, int] = {}
+        self.institution: t.Dict[str, int] = {}
+        self.actor: t.Dict[str, t.Dict[int, int]] = {}
+        self.bounds: t.Dict[int, Bounds] = {}
+        self.date_touches: t.Dict[int, int] = {}
+        self.date_lower: t.Dict[int, int] = {}
+        self.date_upper: t.Dict[int, int] = {}
+        self.date_infinite = 0
+
+    def verify(self, bitmap:int, predicate:t.Callable[[t.Optional[int], t.Optional[int]], bool]) -> int:
+        """keep the ids of `bitmap` whose date bounds match `predicate`"""
+        return from_ids( i for i in to_ids(bitmap) if predicate(*self.bounds[i]) )
+
+    # date filters. `x` is a `NumericRange` for dateRange and
+    # dateExact (`sanitize_date`), a list of 1 year otherwise.
+    # `lower(date)` and `upper(date)` are compared like in
+    # `build_query`: the upper bound of `date` is excluded.
+
+    def date_range(self, x:NumericRange) -> int:
+        """`NOT isempty(date * x)`: the date intersects `[a, b)`"""
+        a, b = x.lower, x.upper
+        first, last = a // 10, (b - 1) // 10
+        inside = union_all( v for d, v in self.date_touches.items() if first < d < last )
+        edges = self.date_touches.get(first, 0) | self.date_touches.get(last, 0) | self.date_infinite
+        return inside | self.verify( edges & ~inside
+                                   , lambda l, u: (l is None or l < b) and (u is None or u > a) )
+
+    def date_exact(self, x:NumericRange) -> int:
+        """`date = x`"""
+        return self.verify( self.date_lower.get(x.lower // 10, 0)
+                          , lambda l, u: l == x.lower and u == x.upper )
+
+    def date_before(self, x:t.List[int]) -> int:
+        """`NOT isempty(date) AND lower(date) <= x`"""
+        decade = x[0] // 10
+        return ( union_all( v for d, v in self.date_lower.items() if d < decade )
+               | self.verify(self.date_lower.get(decade, 0), lambda l, u: l <= x[0]) )
+
+    def date_after(self, x:t.List[int]) -> int:
+        """`NOT isempty(date) AND upper(date) >= x`"""
+        decade = x[0] // 10
+        return ( union_all( v for d, v in self.date_upper.items() if d > decade )
+               | self.verify(self.date_upper.get(decade, 0), lambda l, u: u >= x[0]) )
+
+    def date(self, dates:t.List[t.Dict]) -> int:
+        """
+        the ids matching any of the date filters. like `or_()` without
+        arguments in `build_query`, if there is no valid filter, all ids match.
+        """
+        filters = { "dateRange" : self.date_range,
+                    "dateExact" : self.date_exact,
+                    "dateBefore": self.date_before,
+                    "dateAfter" : self.date_after }
+        dates = [ d for d in dates if d["filter"] in filters ]
+        if not len(dates):
+            return self.all
+        return union_all( filters[d["filter"]](d["data"]) for d in dates )
+
+    # text filters: fallback to SQL
+
+    def title(self, patterns:t.List[str]) -> int:
+        """the ids with a title matching one of the ILIKE `patterns`"""
+        r = db.session.execute( select(Title.id_iconography)
+                                .filter(Title.entry_name.ilike(any_(patterns))) )
+        return from_ids( row[0] for row in r.all() )
+
+    def actors(self, role:str, patterns:t.List[str]) -> int:
+        """the ids with an actor with `role`, whose name matches one of the ILIKE `patterns`"""
+        r = db.session.execute( select(Actor.id)
+                                .filter(Actor.entry_name.ilike(any_(patterns))) )
+        postings = self.actor.get(role, {})
+        return union_all( postings.get(row[0], 0) for row in r.all() )
+
+    def names(self, postings:t.Dict[str, int], names:t.List[str]) -> int:
+        """the ids in the posting lists of `names`"""
+        return union_all( postings.get(n, 0) for n in names if isinstance(n, str) )
+
+
+def build_index(version:str) -> BitmapIndex:
+    """
+    load the posting lists of all filters from the database (in 5 queries)
+    """
+    index = BitmapIndex(version)
+
+    def grouped(rows:t.Iterable[t.Tuple]) -> t.Dict[t.Any, t.List]:
+        """group `rows` = [ ( <key>, <value> ) ] by key"""
+        out = {}
+        for k, v in rows:
+            out.setdefault(k, []).append(v)
+        return out
+
+    # `rows` = [ ( <key>, <iconography id> ) ] => { <key>: <bitmap> }
+    group = lambda rows: { k: from_ids(ids) for k, ids in grouped(rows).items() }
+
+    dates = db.session.execute(select(Iconography.id, Iconography.date)).all()
+    index.all = from_ids( row[0] for row in dates )
+
+    index.theme = group(db.session.execute(
+        select(Theme.entry_name, R_IconographyTheme.id_iconography)
+        .join(Theme, Theme.id == R_IconographyTheme.id_theme)
+    ).all())
+    index.named_entity = group(db.session.execute(
+        select(NamedEntity.entry_name, R_IconographyNamedEntity.id_iconography)
+        .join(NamedEntity, NamedEntity.id == R_IconographyNamedEntity.id_named_entity)
+    ).all())
+    index.institution = group(db.session.execute(
+        select(Institution.entry_name, R_Institution.id_iconography)
+        .join(Institution, Institution.id == R_Institution.id_institution)
+        .filter(R_Institution.id_iconography.is_not(None))
+    ).all())
+    actors = db.session.execute(
+        select(R_IconographyActor.role, R_IconographyActor.id_actor, R_IconographyActor.id_iconography)
+    ).all()
+    for role, rows in grouped( (role, (id_actor, id_)) for role, id_actor, id_ in actors ).items():
+        index.actor[role] = group(rows)
+
+    # dates: NULL and empty ranges never match a date filter
+    touches, lower, upper, infinite = [], [], [], []
+    for id_, date in dates:
+        if date is None or date.isempty:
+            continue
+        l, u = date.lower, date.upper
+        if date.lower is not None and not date.lower_inc:  # canonical form: `[l, u)`
+            l += 1
+        if date.upper is not None and date.upper_inc:
+            u += 1
+        index.bounds[id_] = ( l, u )
+        if l is not None:
+            lower.append(( l // 10, id_ ))
+        if u is not None:
+            upper.append(( u // 10, id_ ))
+        if l is None or u is None:
+            infinite.append(id_)
+        else:
+            touches += [ ( d, id_ ) for d in range(l // 10, (u - 1) // 10 + 1) ]
+    index.date_touches = group(touches)
+    index.date_lower = group(lower)
+    index.date_upper = group(upper)
+    index.date_infinite = from_ids(infinite)
+    return index
+
+
+# *********************************************
+# one index per worker
+
+_index: t.Optional[BitmapIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> BitmapIndex:
+    """
+    return the index of the current data version. if the data version
+    has changed, the index is rebuilt. while it is rebuilt, other threads
+    use the previous index instead of waiting.
+    """
+    global _index
+    version = get_data_version()
+    if _index is not None and _index.version == version:
+        return _index
+    if not _index_lock.acquire(blocking=_index is None):
+        return _index
+    try:
+        if _index is None or _index.version != version:
+            _index = build_index(version)
+            app.logger.info(f"search: bitmap index built for data version `{version}`")
+    finally:
+        _index_lock.release()
+    return _index
+
+
+# *********************************************
+# search
+
+def evaluate(params:t.Dict, index:BitmapIndex) -> int:
+    """
+    evaluate the sanitized `params` on `index`, with the same logic as
+    `build_query`:
+    >>> ( <all "and" filters> AND NOT <each "not" filter> ) UNION <each "or" filter>
+
+    quirks of `build_query` that are kept, so that both engines return the same results:
+    - a `publisher` filter is only used with the boolean op "and".
+    - the `date` filters are combined with OR. if none is valid, all ids match.
+
+    :returns: the bitmap of the matching ids
+    """
+    base = index.all
+    subqueries = {}  # { <filter name>: [ <bitmap>, <boolean op> ] }
+
+    filters = { "title"       : lambda v: index.title(v),
+                "author"      : lambda v: index.actors("author", v),
+                "publisher"   : lambda v: index.actors("publisher", v),
+                "named_entity": lambda v: index.names(index.named_entity, v),
+                "theme"       : lambda v: index.names(index.theme, v),
+                "institution" : lambda v: index.names(index.institution, v),
+                "date"        : lambda v: index.date(v) }
+    for name, f in filters.items():
+        if not params.get(name):
+            continue
+        op = params.get(f"{name}_boolean_op")
+        if op == "and":
+            base &= f(params[name])
+        elif name != "publisher":
+            subqueries[name] = [ f(params[name]), op ]
+
+    full = base
+    for bitmap, op in subqueries.values():
+        if op == "not":
+            full &= ~bitmap
+    for bitmap, op in subqueries.values():
+        if op == "or":
+            full |= bitmap
+    return full
+
+
+def search_ids_bitmap(params:t.Dict) -> t.List[int]:
+    """
+    return the sorted list of `Iconography.id` matching the sanitized `params`
+    """
+    return to_ids(evaluate(params, get_index()))
@@ -1,15 +1,18 @@
 from sqlalchemy.engine.result import ChunkedIteratorResult
 from sqlalchemy.sql.expression import and_, any_, or_
 from psycopg2.extras import NumericRange
-from sqlalchemy import select, func, union
+from sqlalchemy import select, func, union, Select
 from flask import current_app
+import hashlib
+import json
 import typing as t
 
 from ..orm import ( Iconography, Title, Actor, Theme, NamedEntity
                   , Institution, R_Institution, R_IconographyActor
                   , R_IconographyNamedEntity, R_IconographyTheme)
+from ..caching.cache_version import get_data_version
 from ..utils.converters import list2int4range
-from ..app import db
+from ..app import db, cache
 
 
 # *******************************************************
@@ -250,10 +253,54 @@ def sanitize_params(params:t.Dict) -> t.Tuple[t.Dict, bool]:
     return params, valid
 
 
-def make_query(params:t.Dict) -> ChunkedIteratorResult:
+def normalize_params(params:t.Dict) -> t.Dict:
     """
-    build and run an SQL query based on the validated, user inputted
-    parameters `params`. at each `if`, new parameters are added, either
+    build a canonical version of the sanitized `params`, so that two
+    searches that are equivalent produce the same result.
+    - all arrays are sorted (the values of a filter are combined with
+      `ANY` / `IN` / `OR`, so their order doesn't matter)
+    - `NumericRange` are converted to `[lower, upper, lower_inc, upper_inc]`
+    - empty filters are removed, together with their boolean operator
+      (an empty filter's boolean operator is not used by `make_query`).
+
+    `sanitize_params` must have been run before: the boolean operators
+    have been resolved by `sanitize_op` and the dates converted by `sanitize_date`.
+
+    :example:
+    >>> normalize_params({ "theme": ["boutique", "actualité"], "theme_boolean_op": "and",
+    ...                    "title": [], "title_boolean_op": "or", ... })
+    {'theme': ['actualité', 'boutique'], 'theme_boolean_op': 'and'}
+    """
+    normalize_date = lambda d: { "filter": d["filter"],
+                                 "data": ( [ d["data"].lower, d["data"].upper, d["data"].lower_inc, d["data"].upper_inc ]
+                                           if isinstance(d["data"], NumericRange)
+                                           else d["data"] ) }
+    sort_key = lambda x: json.dumps(x, sort_keys=True)
+    out = {}
+    for k, v in params.items():
+        if "_boolean_op" in k or not len(v):
+            continue
+        if k == "date":
+            v = [ normalize_date(d) for d in v ]
+        out[k] = sorted(v, key=sort_key)
+        out[f"{k}_boolean_op"] = params.get(f"{k}_boolean_op", "and")
+    return out
+
+
+def make_query_key(params:t.Dict) -> str:
+    """
+    build a cache key from the data version and the sanitized `params`:
+    `search/iconography/<data version>/<sha1 of the normalized params>`
+    """
+    params = json.dumps(normalize_params(params), sort_keys=True, ensure_ascii=False)
+    return f"search/iconography/{get_data_version()}/{hashlib.sha1(params.encode()).hexdigest()}"
+
+
+def build_query(params:t.Dict) -> Select:
+    """
+    build an SQL query based on the validated, user inputted
+    parameters `params`. the query selects all the matching
+    `Iconography.id`. at each `if`, new parameters are added, either
     to our main query object (`base_query`), or to a dict of sub-queries
     (`subqueries`).
     date filtering is inclusive by default.
@@ -463,9 +510,60 @@ def make_query(params:t.Dict) -> ChunkedIteratorResult:
         stmt_or  = [ v[0] for v in subqueries.values() if v[1] == "or" ]
         full_query = union(full_query, *[ s for s in stmt_or ])
 
-    r = db.session.execute(select( Iconography ).filter( Iconography.id.in_(full_query) ))
+    return full_query
+
+
+def search_ids(params:t.Dict) -> t.List[int]:
+    """
+    return the sorted list of `Iconography.id` matching the sanitized `params`.
+    the list is cached, using a key built from a canonical version of `params`
+    (see `normalize_params`): when the same search is sent again (when users
+    go back and forth between pages), the search query is not rerun.
+    with `SEARCH_ENGINE = "bitmap"` in the config, the search is evaluated
+    in memory by `search_bitmap.py` instead of running `build_query`.
+    """
+    key = make_query_key(params)
+    ids = cache.get(key)
+    if ids is None and current_app.config.get("SEARCH_ENGINE", "sql") == "bitmap":
+        from .search_bitmap import search_ids_bitmap  # avoid circular imports
+        ids = search_ids_bitmap(params)
+        cache.set(key, ids)
+    elif ids is None:
+        ids = sorted( row[0] for row in db.session.execute(build_query(params)).all() )
+        cache.set(key, ids)
+    return ids
+
+
+def search_page(params:t.Dict, limit:int, offset:int=0) -> t.Tuple[int, t.List[int]]:
+    """
+    paginated version of `search_ids`. the ids are sorted, so that the
+    pages are stable, and the total is the length of the cached list
+    of ids: only the first page of a search runs the search query.
+
+    :param params: the sanitized query parameters
+    :param limit : the max number of ids in the page
+    :param offset: the number of ids to skip
+    :returns     : the total number of results and the ids of the page
+    """
+    ids = search_ids(params)
+    return len(ids), ids[offset:offset+limit]
+
+
+def make_query(params:t.Dict, options:t.Optional[t.List]=None) -> ChunkedIteratorResult:
+    """
+    run the advanced search for `params` and return the matching
+    `Iconography` objects. the heavy lifting is done by `build_query`,
+    whose results are cached by `search_ids`.
+
+    :param params : the sanitized query parameters
+    :param options: loader options for the relationships used by the caller (see `orm/loaders.py`)
+    """
+    r = db.session.execute(select( Iconography )
+                           .options( *(options or []) )
+                           .filter( Iconography.id.in_(search_ids(params)) ))
 
     if current_app.config["TESTING"]:
+        full_query = build_query(params)
         import sqlparse
         # `.all()` closes the transaction, which means that we won't be able
         # to access the query results down the road, which will raise unecessary
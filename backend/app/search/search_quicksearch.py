@@ -15,14 +15,25 @@ and return the objects:
 - theme
 - institution
 - place
+
+3 engines are available (`QUICKSEARCH_ENGINE` in the config):
+- "ilike": `ILIKE '%<query>%'` on all the tables above
+- "fulltext": full-text search on the `quicksearch` materialized view
+  (see `db/20261018_quicksearch_fulltext.sql`), with results
+  ordered by relevance.
+- "memory": same results as "ilike", answered by a trigram index
+  kept in memory by each worker (see `search_trigram.py`).
 """
 import typing as t
 from uuid import uuid4
+import click
 import re
 
-from sqlalchemy import select, or_, bindparam
+from flask import current_app
+from sqlalchemy import select, or_, bindparam, func, cast, literal, table, column, text
+from sqlalchemy.dialects.postgresql import REGCONFIG
 
-from ..app import db
+from ..app import app, db
 from ..orm import ( Institution
                   , NamedEntity
                   , Theme
@@ -103,10 +114,94 @@ query_iconography = lambda qstr: (
     )).join(Iconography.title) )
 
 
+# *********************************************
+# full-text search
+
+"""
+the materialized view created by `db/20261018_quicksearch_fulltext.sql`
+"""
+quicksearch_view = table( "quicksearch"
+                        , column("table_name")
+                        , column("id_uuid")
+                        , column("entry_name")
+                        , column("document") )
+
+FULLTEXT_CONFIG = "public.french_unaccent"  # text search configuration: `french` + `unaccent`
+
+
+def to_tsquery_prefix(query_string:str) -> str:
+    """
+    convert the query string to a `to_tsquery` expression, where all
+    words must match and each word is a prefix (so that results are
+    found while the user is typing): `"rue viv"` => `"rue:* & viv:*"`.
+    all characters that aren't letters or digits are removed.
+    """
+    words = re.findall(r"\w+", query_string.lower())
+    return " & ".join( f"{w}:*" for w in words )
+
+
+def quick_search_fulltext(query_string:str) -> t.List[t.Dict]:
+    """
+    run the quick search on the `quicksearch` materialized view, ordered by relevance.
+    """
+    tsquery = to_tsquery_prefix(query_string)
+    if not tsquery:
+        return []
+    q = func.to_tsquery(cast(literal(FULLTEXT_CONFIG), REGCONFIG), tsquery)
+    r = db.session.execute(
+        select( quicksearch_view.c.table_name
+              , quicksearch_view.c.id_uuid
+              , quicksearch_view.c.entry_name )
+        .filter( quicksearch_view.c.document.op("@@")(q) )
+        .order_by( func.ts_rank(quicksearch_view.c.document, q).desc()
+                 , quicksearch_view.c.table_name
+                 , quicksearch_view.c.entry_name )
+    )
+    return [ restructure_row(row) for row in r.all() ]
+
+
+def refresh_quicksearch() -> int:
+    """
+    refresh the `quicksearch` materialized view, after the data has changed.
+    the refresh is concurrent (it uses the unique index of the view), so
+    the full-text searches still read the old rows until it is done.
+    it's run by `bump_data_version`: if an import doesn't bump the data
+    version, the full-text engine serves the old data.
+
+    :returns: the number of rows in the view
+    """
+    db.session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY quicksearch;"))
+    db.session.commit()
+    return db.session.execute(select(func.count()).select_from(quicksearch_view)).scalar_one()
+
+
+@app.cli.command("quicksearch-refresh")
+def quicksearch_refresh_command() -> None:
+    """
+    refresh the full-text index of the quick search after an import.
+    """
+    click.echo(f"quicksearch: {refresh_quicksearch()} rows")
+    return
+
+
 # *********************************************
 # pipeline
 
 def quick_search(query_string:str) -> t.List[t.Dict]:
+    """
+    run the quick search with the engine defined by `QUICKSEARCH_ENGINE`
+    in the config ("ilike" by default, "fulltext" or "memory").
+    """
+    engine = current_app.config.get("QUICKSEARCH_ENGINE", "ilike")
+    if engine == "fulltext":
+        return quick_search_fulltext(query_string)
+    if engine == "memory":
+        from .search_trigram import quick_search_memory  # avoid circular imports
+        return [ restructure_row(row) for row in quick_search_memory(to_ilike(query_string)) ]
+    return quick_search_ilike(query_string)
+
+
+def quick_search_ilike(query_string:str) -> t.List[t.Dict]:
     """
     main process: combine above queries to build+run the query and format+return results.
     """
@@ -0,0 +1,243 @@
+"""
+in-memory engine for the quick search (`QUICKSEARCH_ENGINE = "memory"`).
+
+the texts searched by the quick search (titles, actor names, themes,
+named entities, institutions and addresses) are loaded once in each
+worker and indexed by trigrams, so that the quick search is answered
+without querying the database.
+
+the output is the same as the ILIKE engine (`search_quicksearch.py`):
+- the query string is prepared with `to_ilike`, and matched against
+  the lowercased texts like `ILIKE` would (`%` and `_` are wildcards,
+  `\\` escapes them).
+- the rows are grouped like in the SQL queries: an iconography resource
+  is returned (1 row per title) if one of its titles or actors matches,
+  a place (1 row per address) if one of its addresses matches.
+
+the index is built when the worker starts (see `start_trigram_index`)
+and rebuilt when the data version changes (see `get_index`).
+"""
+from array import array
+import threading
+import typing as t
+import re
+
+from flask import Flask
+from sqlalchemy import select
+
+from ..caching.cache_version import get_data_version
+from ..app import app, db
+from ..orm import ( Iconography, Title, Actor, Theme, NamedEntity, Institution
+                  , Place, Address, R_IconographyActor, R_AddressPlace )
+
+
+Row = t.Tuple[str, str, t.Optional[str]]  # ( <table name>, <id_uuid>, <entry_name> )
+
+
+def trigrams(s:str) -> t.Set[str]:
+    """all the trigrams of `s`"""
+    return { s[i:i+3] for i in range(len(s) - 2) }
+
+
+class IlikePattern:
+    """
+    an ILIKE pattern (the output of `to_ilike`), that can be
+    matched against lowercased strings.
+    """
+    def __init__(self, pattern:str):
+        regex, literals, current = "", [], ""
+        special = False
+        i = 0
+        while i < len(pattern):
+            c = pattern[i]
+            if c == "\\" and i + 1 < len(pattern):  # escaped character
+                i += 1
+                regex += re.escape(pattern[i])
+                current += pattern[i]
+            elif c in "%_":
+                regex += ".*" if c == "%" else "."
+                literals.append(current)
+                current = ""
+                special = special or 0 < i < len(pattern) - 1
+            else:
+                regex += re.escape(c)
+                current += c
+            i += 1
+        literals.append(current)
+
+        self.literals = [ l for l in literals if l ]
+        # most patterns are `%<text>%`: they're matched with `in`, without a regex
+        self.substring = ( None if special or len(self.literals) != 1
+                                            or not (pattern.startswith("%") and pattern.endswith("%"))
+                           else self.literals[0] )
+        self.regex = re.compile(regex, re.DOTALL)
+
+    def match(self, s:str) -> bool:
+        if self.substring is not None:
+            return self.substring in s
+        return self.regex.fullmatch(s) is not None
+
+    def longest_literal(self) -> str:
+        """the longest part of the pattern that contains no wildcard"""
+        return max(self.literals, key=len, default="")
+
+
+class TrigramIndex:
+    """
+    trigram index of the texts searched by the quick search.
+
+    - `texts`      : the distinct lowercased texts
+    - `postings`   : { <trigram>: <ids of the texts containing the trigram> }
+    - `text_groups`: for each text, the ids of the groups that contain it
+    - `groups`     : for each group, the rows returned if one of its texts matches
+    """
+    def __init__(self, version:str):
+        self.version = version
+        self.texts: t.List[str] = []
+        self.text_ids: t.Dict[str, int] = {}
+        self.text_groups: t.List[t.List[int]] = []
+        self.groups: t.List[t.List[Row]] = []
+        self.postings: t.Dict[str, array] = {}
+
+    def add_group(self, texts:t.Iterable[t.Optional[str]], rows:t.List[Row]) -> None:
+        """
+        add a group of rows, returned when one of `texts` matches
+        """
+        gid = len(self.groups)
+        self.groups.append(rows)
+        for text in set(texts):
+            if text is None:  # `NULL ILIKE ...` is never true
+                continue
+            text = text.lower()
+            if text not in self.text_ids:
+                tid = len(self.texts)
+                self.text_ids[text] = tid
+                self.texts.append(text)
+                self.text_groups.append([])
+                for tg in trigrams(text):
+                    self.postings.setdefault(tg, array("I")).append(tid)
+            self.text_groups[self.text_ids[text]].append(gid)
+        return
+
+    def candidates(self, pattern:IlikePattern) -> t.Iterable[int]:
+        """
+        ids of the texts that may match `pattern`: the texts containing the
+        rarest trigram of the longest literal part of the pattern. if the
+        pattern has no trigram, all texts are candidates.
+        """
+        grams = trigrams(pattern.longest_literal())
+        if not grams:
+            return range(len(self.texts))
+        return min(( self.postings.get(g, array("I")) for g in grams ), key=len)
+
+    def search(self, pattern:str) -> t.List[Row]:
+        """
+        return the rows of all groups where a text matches the ILIKE `pattern`
+        """
+        pattern = IlikePattern(pattern)
+        gids = set()
+        for tid in self.candidates(pattern):
+            if pattern.match(self.texts[tid]):
+                gids.update(self.text_groups[tid])
+        rows = { row for gid in gids for row in self.groups[gid] }  # UNION removes duplicate rows
+        return sorted(rows, key=lambda r: (r[0], r[2] or "", r[1]))
+
+
+def build_index(version:str) -> TrigramIndex:
+    """
+    load all texts and rows of the quick search from the
+    database (in 6 queries), and build the trigram index.
+    """
+    index = TrigramIndex(version)
+
+    # iconography: 1 row per title, matched on titles and actors
+    titles, actors = {}, {}
+    for id_, id_uuid, title in db.session.execute(
+        select(Iconography.id, Iconography.id_uuid, Title.entry_name)
+        .join(Title, Title.id_iconography == Iconography.id)
+    ).all():
+        titles.setdefault(id_, []).append(( Iconography.__tablename__, id_uuid, title ))
+    for id_iconography, actor in db.session.execute(
+        select(R_IconographyActor.id_iconography, Actor.entry_name)
+        .join(Actor, Actor.id == R_IconographyActor.id_actor)
+    ).all():
+        actors.setdefault(id_iconography, []).append(actor)
+    for id_, rows in titles.items():
+        index.add_group([ r[2] for r in rows ] + actors.get(id_, []), rows)
+
+    # place: 1 row per address, matched on addresses
+    places = {}
+    for id_, id_uuid, address in db.session.execute(
+        select(Place.id, Place.id_uuid, Address.address)
+        .join(R_AddressPlace, R_AddressPlace.id_place == Place.id)
+        .join(Address, Address.id == R_AddressPlace.id_address)
+    ).all():
+        places.setdefault(id_, []).append(( Place.__tablename__, id_uuid, address ))
+    for rows in places.values():
+        index.add_group([ r[2] for r in rows ], rows)
+
+    # theme, named entity, institution: 1 row, matched on `entry_name`
+    for table in [ Theme, NamedEntity, Institution ]:
+        for id_uuid, entry_name in db.session.execute(
+            select(table.id_uuid, table.entry_name)
+        ).all():
+            index.add_group([ entry_name ], [ ( table.__tablename__, id_uuid, entry_name ) ])
+
+    return index
+
+
+# *********************************************
+# one index per worker
+
+_index: t.Optional[TrigramIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> TrigramIndex:
+    """
+    return the index of the current data version. if the data version
+    has changed, the index is rebuilt. while it is rebuilt, other threads
+    use the previous index instead of waiting.
+    """
+    global _index
+    version = get_data_version()
+    if _index is not None and _index.version == version:
+        return _index
+    if not _index_lock.acquire(blocking=_index is None):
+        return _index
+    try:
+        if _index is None or _index.version != version:
+            _index = build_index(version)
+            app.logger.info(f"quicksearch: trigram index built for data version `{version}` ({len(_index.texts)} texts)")
+    finally:
+        _index_lock.release()
+    return _index
+
+
+def quick_search_memory(pattern:str) -> t.List[Row]:
+    """
+    run the quick search on the trigram index.
+    :param pattern: the query string prepared with `to_ilike`
+    """
+    return get_index().search(pattern)
+
+
+def start_trigram_index(_app:Flask) -> None:
+    """
+    if `QUICKSEARCH_ENGINE` is "memory", build the
+    index in a background thread when the worker starts.
+    only called by the server entry points (`main.py` and
+    `post_worker_init` in `gunicorn.conf.py`), so that the
+    `flask ...` commands don't build the index. if it isn't
+    started, the index is built by the first quick search.
+    """
+    def build():
+        with _app.app_context():
+            try:
+                get_index()
+            except Exception as e:
+                _app.logger.error(f"quicksearch: error building the trigram index: {e}")
+
+    if _app.config.get("QUICKSEARCH_ENGINE", "ilike") == "memory":
+        threading.Thread(target=build, daemon=True).start()
+    return
@@ -0,0 +1,183 @@
+"""
+typeahead mode of the quick search (route `/i/search/typeahead/<query>`).
+
+the quick search returns all matching rows, while the quicksearch
+dropdown only displays a few results per table. here, for each table
+(iconography, place, theme, named_entity, institution), only the `limit`
+best results are returned, with the total number of results in the table
+and a cursor to fetch the next results of this table ("show more").
+
+the results are matched like in the quick search (`ILIKE '%<query>%'`,
+see `search_quicksearch.py`) and ordered by:
+1. prefix matches first (`entry_name ILIKE '<query>%'`)
+2. lowercased `entry_name`, in codepoint order (`COLLATE "C"`)
+3. `id_uuid`
+
+a cursor is the sort key of the last result of a page, so pages stay
+consistent when the query is repeated (keyset pagination).
+
+with `QUICKSEARCH_ENGINE = "memory"`, the results are ranked in python
+from the trigram index. otherwise, the ranking, counting and
+pagination are done in a single SQL query.
+"""
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+import typing as t
+import json
+
+from flask import current_app
+from sqlalchemy import select, union, case, func, tuple_
+
+from .search_quicksearch import ( to_ilike, restructure_row, query_iconography, query_place
+                                , query_theme, query_named_entity, query_institution )
+from ..app import db
+
+
+"""
+prepare the string `s` to be inserted in an ILIKE filter
+matching values that start with `s`
+"""
+to_ilike_prefix = lambda s: f"{s.strip().lower()}%"
+
+"""
+the tables of the quick search, with their sql query builders
+"""
+TABLES = { "iconography" : query_iconography,
+           "place"       : query_place,
+           "theme"       : query_theme,
+           "named_entity": query_named_entity,
+           "institution" : query_institution }
+
+LIMIT_DEFAULT = 5   # number of results per table
+LIMIT_MAX = 50
+
+
+SortKey = t.Tuple[int, str, str]  # ( <0 if prefix match else 1>, <lowercased entry_name>, <id_uuid> )
+
+
+# *********************************************
+# cursors
+
+def encode_cursor(key:SortKey) -> str:
+    """encode the sort key of the last result of a page"""
+    return urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor:str) -> SortKey:
+    """
+    decode a cursor created by `encode_cursor`.
+    :raises ValueError: if the cursor is invalid
+    """
+    try:
+        rank, name, id_uuid = json.loads(urlsafe_b64decode(cursor.encode("ascii")))
+        assert isinstance(rank, int) and isinstance(name, str) and isinstance(id_uuid, str)
+    except Exception:
+        raise ValueError(f"Invalid `cursor`: `{cursor}`")
+    return rank, name, id_uuid
+
+
+# *********************************************
+# engines. both return { <table name>: ( <total>, [ ( <row>, <sort key> ) ] ) },
+# with `limit+1` rows per table to know if there's a next page
+
+def typeahead_sql( query_string:str
+                 , tables:t.List[str]
+                 , limit:int
+                 , after:t.Optional[SortKey]=None ) -> t.Dict:
+    """
+    rank, count and paginate the results of the ILIKE quick search in 1 query:
+    `COUNT(*) OVER` gives the total per table before the cursor filter is
+    applied, `ROW_NUMBER() OVER` numbers the results after the cursor.
+    """
+    pattern = to_ilike(query_string)
+    results = union(*[ TABLES[tn](pattern) for tn in tables ]).subquery()
+    table_name, id_uuid, entry_name = list(results.c)
+
+    ranked = select( table_name.label("table_name")
+                   , id_uuid.label("id_uuid")
+                   , entry_name.label("entry_name")
+                   , case( (entry_name.ilike(to_ilike_prefix(query_string)), 0), else_=1 ).label("rank")
+                   , func.lower(func.coalesce(entry_name, "")).collate("C").label("sortname")
+                   , func.count().over(partition_by=table_name).label("total")
+                   ).subquery()
+    order = ( ranked.c.rank, ranked.c.sortname, ranked.c.id_uuid )
+    numbered = select( ranked
+                     , func.row_number().over(partition_by=ranked.c.table_name, order_by=order).label("rn") )
+    if after is not None:
+        numbered = numbered.filter( tuple_(*order) > tuple_(*after) )
+    numbered = numbered.subquery()
+
+    r = db.session.execute(
+        select(numbered)
+        .filter( numbered.c.rn <= limit + 1 )
+        .order_by( numbered.c.table_name, numbered.c.rn ))
+    out = {}
+    for row in r.mappings().all():
+        rows = out.setdefault(row["table_name"], ( row["total"], [] ))[1]
+        rows.append(( ( row["table_name"], row["id_uuid"], row["entry_name"] )
+                    , ( row["rank"], row["sortname"], row["id_uuid"] ) ))
+    return out
+
+
+def typeahead_memory( query_string:str
+                    , tables:t.List[str]
+                    , limit:int
+                    , after:t.Optional[SortKey]=None ) -> t.Dict:
+    """
+    rank, count and paginate the results of the trigram index
+    (`search_trigram.py`), with the same ordering as `typeahead_sql`.
+    """
+    from .search_trigram import quick_search_memory, IlikePattern  # avoid circular imports
+
+    prefix = IlikePattern(to_ilike_prefix(query_string))
+    out = {}
+    for row in quick_search_memory(to_ilike(query_string)):
+        if row[0] in tables:
+            name = (row[2] or "").lower()
+            out.setdefault(row[0], []).append(( row, ( 0 if prefix.match(name) else 1, name, row[1] ) ))
+    for tn, rows in out.items():
+        rows.sort(key=lambda r: r[1])
+        out[tn] = ( len(rows), [ r for r in rows if after is None or r[1] > after ][:limit+1] )
+    return out
+
+
+# *********************************************
+# pipeline
+
+def typeahead( query_string:str
+             , limit:int=LIMIT_DEFAULT
+             , table:t.Optional[str]=None
+             , cursor:t.Optional[str]=None ) -> t.Dict:
+    """
+    run the quick search in typeahead mode.
+
+    :param query_string: the query
+    :param limit       : the max number of results per table
+    :param table       : if not None, only search this table
+    :param cursor      : return the results after this cursor. requires `table`
+    :raises ValueError : if a parameter is invalid
+    :returns:
+        { <table name>: { "total"  : <number of results in the table>,
+                          "results": [ { table_name: str, id_uuid: str, entry_name: str } ],
+                          "cursor" : <cursor of the next page, or None> } }
+    """
+    if not 0 < limit <= LIMIT_MAX:
+        raise ValueError(f"Invalid `limit`: expected an integer between 1 and {LIMIT_MAX}, got `{limit}`")
+    if table is not None and table not in TABLES:
+        raise ValueError(f"Invalid `table`: expected one of {list(TABLES)}, got `{table}`")
+    if cursor is not None and table is None:
+        raise ValueError("`cursor` requires `table`")
+    tables = [ table ] if table is not None else list(TABLES)
+    after = decode_cursor(cursor) if cursor is not None else None
+
+    if current_app.config.get("QUICKSEARCH_ENGINE", "ilike") == "memory":
+        results = typeahead_memory(query_string, tables, limit, after)
+    else:
+        results = typeahead_sql(query_string, tables, limit, after)
+
+    out = {}
+    for tn in tables:
+        total, rows = results.get(tn, ( 0, [] ))
+        out[tn] = { "total"  : total,
+                    "results": [ restructure_row(row) for row, _ in rows[:limit] ],
+                    "cursor" : encode_cursor(rows[limit-1][1]) if len(rows) > limit else None }
+    return out
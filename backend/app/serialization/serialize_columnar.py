@@ -0,0 +1,128 @@
+"""
+columnar response format.
+
+the index routes return long lists of objects with the same keys, and
+some values are repeated many times (the authors of iconography resources,
+the categories of themes, the cartographic sources of places...). when the
+client passes `?format=columnar`, these lists are sent in a columnar
+format instead: 1 array per field, and the repeated values are
+dictionary-encoded (replaced by their index in a list of distinct values).
+
+>>> to_columnar([ {"a": 1, "b": "x"}, {"a": 2, "b": "x"} ], dictionary=["b"])
+{ "format": "columnar",
+  "length": 2,
+  "fields": ["a", "b"],
+  "columns": { "a": [1, 2], "b": [0, 0] },
+  "dictionaries": { "b": ["x"] } }
+
+in a dictionary-encoded column:
+- a list is encoded element by element: `[ {author 1}, {author 2} ]`
+  becomes `[ <index of author 1>, <index of author 2> ]`.
+- `None` is not encoded.
+- any other value is replaced by its index.
+
+`from_columnar` converts the columnar format back to a list of objects.
+"""
+import typing as t
+
+from flask import Response, jsonify, request
+
+
+COLUMNAR = "columnar"
+FORMATS = [ "json", COLUMNAR ]  # allowed values of the `format` parameter. `json` is the default
+
+
+def _freeze(value:t.Any) -> t.Hashable:
+    """
+    build a hashable version of a JSON value, to find the
+    index of a value in a dictionary. the type is part of the
+    key, since `True == 1 == 1.0` in python.
+    """
+    if isinstance(value, dict):
+        return ("d", tuple( (k, _freeze(v)) for k,v in sorted(value.items()) ))
+    if isinstance(value, list):
+        return ("l", tuple( _freeze(v) for v in value ))
+    return ("v", type(value).__name__, value)
+
+
+class Dictionary:
+    """
+    the distinct values of a dictionary-encoded column.
+    """
+    def __init__(self):
+        self.values = []
+        self.index = {}
+
+    def encode_value(self, value:t.Any) -> int:
+        key = _freeze(value)
+        if key not in self.index:
+            self.index[key] = len(self.values)
+            self.values.append(value)
+        return self.index[key]
+
+    def encode(self, value:t.Any) -> t.Any:
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return [ self.encode_value(v) for v in value ]
+        return self.encode_value(value)
+
+
+def to_columnar( records:t.List[t.Dict]
+               , dictionary:t.Optional[t.List[str]]=None ) -> t.Dict:
+    """
+    convert a list of objects with the same keys to the columnar format.
+
+    :param records   : the objects to convert
+    :param dictionary: the fields to dictionary-encode
+    """
+    dictionary = dictionary or []
+    fields = list(records[0].keys()) if len(records) else []
+    dictionaries = { f: Dictionary() for f in dictionary if f in fields }
+    columns = {}
+    for f in fields:
+        column = [ r.get(f, None) for r in records ]
+        if f in dictionaries:
+            column = [ dictionaries[f].encode(v) for v in column ]
+        columns[f] = column
+    return { "format"      : COLUMNAR,
+             "length"      : len(records),
+             "fields"      : fields,
+             "columns"     : columns,
+             "dictionaries": { f: d.values for f,d in dictionaries.items() } }
+
+
+def from_columnar(data:t.Dict) -> t.List[t.Dict]:
+    """
+    convert the output of `to_columnar` back to a list of objects
+    """
+    columns = {}
+    for f in data["fields"]:
+        column = data["columns"][f]
+        if f in data["dictionaries"]:
+            values = data["dictionaries"][f]
+            column = [ None if v is None
+                       else [ values[i] for i in v ] if isinstance(v, list)
+                       else values[v]
+                       for v in column ]
+        columns[f] = column
+    return [ { f: columns[f][i] for f in data["fields"] }
+             for i in range(data["length"]) ]
+
+
+def listing( records:t.List[t.Dict]
+           , dictionary:t.Optional[t.List[str]]=None ) -> Response | t.Tuple[str, int]:
+    """
+    return a list of objects as a JSON response, in the format
+    given by the `format` query parameter (see `FORMATS`).
+    routes using this must be cached with `@cached_listing()`.
+
+    :param records   : the objects to return
+    :param dictionary: the fields to dictionary-encode in the columnar format
+    """
+    fmt = request.args.get("format", "json")
+    if fmt not in FORMATS:
+        return f"Invalid `format`: expected one of {FORMATS}, got `{fmt}`", 400
+    if fmt == COLUMNAR:
+        return jsonify(to_columnar(records, dictionary))
+    return jsonify(records)
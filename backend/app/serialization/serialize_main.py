@@ -0,0 +1,90 @@
+"""
+detail loader for the main page of an iconography resource
+(route `/i/iconography/<id_uuid>`).
+
+`Iconography.serialize_full` serializes the places with `Place.serialize_lite`
+(filenames, addresses and 1 COUNT query per place), while the route only
+keeps the places' geometries and UUIDs to build a GeoJSON FeatureCollection.
+the themes and named entities are serialized by loading all of their
+relations to iconography, only to count them.
+
+here, the places' features, the themes and the named entities of all
+iconography resources are loaded with 1 query each, and the
+FeatureCollection is built directly. the output is the same as
+`serialize_full` followed by the conversion of places to GeoJSON.
+"""
+import typing as t
+
+from sqlalchemy import select, func
+
+from ..utils.spatial import geometry_to_feature, featurelist_to_featurecollection
+from ..orm.loaders import loader
+from ..app import db
+from ..orm import ( Iconography, Place, Theme, NamedEntity, R_IconographyPlace
+                  , R_IconographyTheme, R_IconographyNamedEntity )
+
+
+def place_features(ids:t.List[int]) -> t.Dict[int, t.Dict]:
+    """
+    build the GeoJSON FeatureCollection of the places of
+    each iconography resource in `ids`, in a single query.
+
+    :returns: { <iconography id>: <FeatureCollection> }
+    """
+    out = { i: [] for i in ids }
+    r = db.session.execute(
+        select(R_IconographyPlace.id_iconography, Place.id_uuid, Place.vector)
+        .join(Place, Place.id == R_IconographyPlace.id_place)
+        .filter(R_IconographyPlace.id_iconography.in_(ids))
+        .order_by(R_IconographyPlace.id)
+    )
+    for id_iconography, id_uuid, vector in r.all():
+        out[id_iconography].append(geometry_to_feature(vector, custom_properties={"id_uuid": id_uuid}))
+    return { i: featurelist_to_featurecollection(features) for i, features in out.items() }
+
+
+def qualifiers_lite(ids:t.List[int], model:Theme|NamedEntity, rel, fk) -> t.Dict[int, t.List[t.Dict]]:
+    """
+    serialize the themes or named entities of each iconography resource
+    in `ids` with `serialize_lite`, in a single query. the iconography
+    counts are computed by the query, instead of loading all relations.
+
+    :param model: `Theme` or `NamedEntity`
+    :param rel  : the relationship table between `Iconography` and `model`
+    :param fk   : the foreign key to `model` in `rel`
+    :returns    : { <iconography id>: [ <serialize_lite()> ] }
+    """
+    out = { i: [] for i in ids }
+    counts = ( select(fk.label("id"), func.count(rel.id).label("count"))
+               .filter(fk.in_( select(fk).filter(rel.id_iconography.in_(ids)) ))
+               .group_by(fk)
+               .subquery() )
+    r = db.session.execute(
+        select(rel.id_iconography, model, counts.c.count)
+        .join(model, model.id == fk)
+        .join(counts, counts.c.id == model.id)
+        .filter(rel.id_iconography.in_(ids))
+        .order_by(rel.id)
+    )
+    for id_iconography, obj, count in r.all():
+        out[id_iconography].append(obj.serialize_lite(iconography_count=count))
+    return out
+
+
+def iconography_main(id_uuid:str) -> t.List[t.Dict]:
+    """
+    return the iconography resource(s) matching `id_uuid`, serialized
+    with `serialize_full`, with the places as a FeatureCollection.
+    """
+    r = db.session.execute(select(Iconography)
+                           .options(*loader("iconography_main"))
+                           .filter(Iconography.id_uuid == id_uuid))
+    iconography = r.scalars().all()
+    ids = [ i.id for i in iconography ]
+    places = place_features(ids)
+    themes = qualifiers_lite(ids, Theme, R_IconographyTheme, R_IconographyTheme.id_theme)
+    named_entities = qualifiers_lite(ids, NamedEntity, R_IconographyNamedEntity, R_IconographyNamedEntity.id_named_entity)
+    return [ i.serialize_full( place=places[i.id]
+                             , theme=themes[i.id]
+                             , named_entity=named_entities[i.id] )
+             for i in iconography ]
@@ -0,0 +1,174 @@
+"""
+SQL serialization engine.
+
+build the `serialize_lite` representations of whole tables directly in
+PostgreSQL with `json_build_object` / `json_agg`, instead of loading ORM
+objects and building dicts in Python. each function runs a single query
+that returns one JSON document (a list of objects).
+
+the output must be the same as the ORM serializers
+(`Iconography.serialize_lite_bulk`, `Place.serialize_lite_bulk`,
+`Theme.serialize_lite`), so both engines can be used interchangeably
+(see `SERIALIZATION_ENGINE` in the config): for the same rows, the
+response bodies are the same (`tests/serializations.py`). the only
+difference is that the rows are ordered by `id`.
+"""
+import typing as t
+
+from sqlalchemy import select, func, case, null, literal_column, Select, ColumnElement
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import aliased
+
+from ..caching.cache_thumbnails import thumbnails_query, thumbnail_seed
+from ..app import db
+from ..orm import ( Iconography, Title, Actor, Filename, Place, Address
+                  , Cartography, Theme, R_IconographyActor, R_IconographyPlace
+                  , R_CartographyPlace, R_AddressPlace, R_IconographyTheme )
+
+
+EMPTY_LIST = literal_column("'[]'::json")  # `json_agg` returns NULL instead of an empty list
+
+
+def json_list(element:ColumnElement, *order_by:ColumnElement) -> ColumnElement:
+    """
+    `json_agg(<element> ORDER BY <order_by>)`, with an empty list instead of NULL
+    """
+    return func.coalesce(func.json_agg(aggregate_order_by(element, *order_by)), EMPTY_LIST)
+
+
+def date_list(column:ColumnElement) -> ColumnElement:
+    """SQL version of `utils.converters.int4range2list`"""
+    return case( (column.is_(None), null())
+               , else_=func.json_build_array(func.lower(column), func.upper(column) - 1) )
+
+
+def run(q:Select) -> t.List[t.Dict]:
+    """
+    run a query returning a single JSON document. psycopg2 parses
+    the document, so the output is a list of dicts.
+    """
+    return db.session.execute(q).scalar_one()
+
+
+# *************************************************************
+# iconography
+# *************************************************************
+
+def iconography_lite(ids:t.Optional[t.List[int]]=None) -> t.List[t.Dict]:
+    """
+    SQL version of `Iconography.serialize_lite_bulk`.
+
+    :param ids: the ids to serialize. if None, all rows are serialized.
+    """
+    title = ( select(json_list(Title.entry_name, Title.ismain, Title.id))
+              .filter(Title.id_iconography == Iconography.id)
+              .scalar_subquery() )
+    authors = ( select(json_list( func.json_build_object("id_uuid", Actor.id_uuid, "entry_name", Actor.entry_name)
+                                , R_IconographyActor.ismain
+                                , R_IconographyActor.id ))
+                .join(R_IconographyActor.actor)
+                .filter( R_IconographyActor.id_iconography == Iconography.id
+                       , R_IconographyActor.role == "author" )
+                .scalar_subquery() )
+    thumbnail = ( select(json_list( func.json_build_object("url", Filename.url, "latlngbounds", Filename.latlngbounds)
+                                  , Filename.id ))
+                  .filter( Filename.id_iconography == Iconography.id
+                         , Filename.url.contains("thumbnail") )
+                  .scalar_subquery() )
+    obj = func.json_build_object( "id_uuid"  , Iconography.id_uuid
+                                , "iiif_url" , Iconography.iiif_url
+                                , "date"     , date_list(Iconography.date)
+                                , "authors"  , authors
+                                , "title"    , title
+                                , "thumbnail", thumbnail )
+    q = select(json_list(obj, Iconography.id))
+    if ids is not None:
+        q = q.filter(Iconography.id.in_(ids))
+    return run(q)
+
+
+# *************************************************************
+# place
+# *************************************************************
+
+def place_lite() -> t.List[t.Dict]:
+    """
+    SQL version of `Place.serialize_lite_bulk`, for all places.
+    """
+    # `Place.get_filename_index`: filenames of the cartography
+    # resources whose `map_source` is the place's `vector_source`
+    filename = ( select(json_list( func.json_build_object("url", Filename.url, "latlngbounds", Filename.latlngbounds)
+                                 , R_CartographyPlace.id
+                                 , Filename.id ))
+                 .select_from(R_CartographyPlace)
+                 .join(R_CartographyPlace.cartography)
+                 .join(Filename, Filename.id_cartography == Cartography.id)
+                 .filter( R_CartographyPlace.id_place == Place.id
+                        , Cartography.map_source == Place.vector_source )
+                 .correlate(Place)
+                 .scalar_subquery() )
+
+    # `Place.get_address_index`: the addresses are grouped in a dict by source,
+    # and the 1st value of the dict is returned: that is, the last address
+    # whose source is the source of the 1st address.
+    r_first, a_first = aliased(R_AddressPlace), aliased(Address)
+    first_source = ( select(a_first.source)
+                     .select_from(r_first)
+                     .join(a_first, a_first.id == r_first.id_address)
+                     .filter(r_first.id_place == Place.id)
+                     .order_by(r_first.id)
+                     .limit(1)
+                     .correlate(Place)
+                     .scalar_subquery() )
+    address = ( select(func.json_build_array(func.json_build_object( "id_uuid", Address.id_uuid
+                                                                   , "address", Address.address
+                                                                   , "city"   , Address.city
+                                                                   , "country", Address.country
+                                                                   , "source" , Address.source )))
+                .select_from(R_AddressPlace)
+                .join(Address, Address.id == R_AddressPlace.id_address)
+                .filter( R_AddressPlace.id_place == Place.id
+                       , Address.source == first_source )
+                .order_by(R_AddressPlace.id.desc())
+                .limit(1)
+                .correlate(Place)
+                .scalar_subquery() )
+
+    iconography_count = ( select(func.count(R_IconographyPlace.id))
+                          .filter(R_IconographyPlace.id_place == Place.id)
+                          .correlate(Place)
+                          .scalar_subquery() )
+
+    obj = func.json_build_object( "id_uuid"          , Place.id_uuid
+                                , "date"             , date_list(Place.date)
+                                , "filename"         , filename
+                                , "address"          , func.coalesce(address, EMPTY_LIST)
+                                , "vector"           , Place.vector
+                                , "centroid"         , Place.centroid
+                                , "iconography_count", iconography_count )
+    return run(select(json_list(obj, Place.id)))
+
+
+# *************************************************************
+# theme
+# *************************************************************
+
+def theme_lite() -> t.List[t.Dict]:
+    """
+    SQL version of `Theme.serialize_lite`, for all themes.
+    """
+    thumbnail = thumbnails_query(Theme.__tablename__, thumbnail_seed()).subquery()
+    iconography_count = ( select(func.count(R_IconographyTheme.id))
+                          .filter(R_IconographyTheme.id_theme == Theme.id)
+                          .correlate(Theme)
+                          .scalar_subquery() )
+    obj = func.json_build_object( "id_uuid"          , Theme.id_uuid
+                                , "entry_name"       , Theme.entry_name
+                                , "category_name"    , Theme.category
+                                , "category_slug"    , Theme.category_slug
+                                , "thumbnail"        , case( (thumbnail.c.url.is_(None), EMPTY_LIST)
+                                                           , else_=func.json_build_array(thumbnail.c.url) )
+                                , "iconography_count", iconography_count )
+    return run( select(json_list(obj, Theme.id))
+                .select_from(Theme)
+                .outerjoin(thumbnail, thumbnail.c.id == Theme.id) )
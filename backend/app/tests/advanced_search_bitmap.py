@@ -0,0 +1,50 @@
+"""
+test the in-memory engine of the advanced search
+(`src/search/search_bitmap.py`, `SEARCH_ENGINE = "bitmap"`)
+
+the bitmaps are unit-tested on their own, then the test suites
+of the internal and public APIs are run again, with the bitmap
+engine instead of the SQL engine.
+"""
+import unittest
+
+from .advanced_search_internal import TestAdvancedSearchInternal
+from .advanced_search_public import TestAdvancedSearchPublic
+from ..search.search_bitmap import from_ids, to_ids
+from ..app import app
+
+
+class BitmapEngine:
+    """
+    mixin running the tests of a test case with `SEARCH_ENGINE = "bitmap"`
+    """
+    def setUp(self):
+        super().setUp()
+        self.engine = app.config.get("SEARCH_ENGINE", "sql")
+        app.config["SEARCH_ENGINE"] = "bitmap"
+    def tearDown(self):
+        app.config["SEARCH_ENGINE"] = self.engine
+        super().tearDown()
+
+
+class TestBitmaps(unittest.TestCase):
+    """
+    unit tests of the bitmaps, without the database
+    """
+    def test_bitmaps(self):
+        """
+        test the conversions between lists of ids and bitmaps
+        """
+        for ids in [ [], [0], [1, 5, 64, 1000], list(range(0, 5000, 7)) ]:
+            self.assertEqual( to_ids(from_ids(ids)), ids )
+        self.assertEqual( to_ids(from_ids([1, 2]) & ~from_ids([2, 3])), [1] )
+        self.assertEqual( to_ids(from_ids([1, 2]) | from_ids([2, 3])), [1, 2, 3] )
+        return self
+
+
+class TestAdvancedSearchInternalBitmap(BitmapEngine, TestAdvancedSearchInternal):
+    pass
+
+
+class TestAdvancedSearchPublicBitmap(BitmapEngine, TestAdvancedSearchPublic):
+    pass
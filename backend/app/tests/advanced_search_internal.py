@@ -431,6 +431,31 @@ class TestAdvancedSearchInternal(unittest.TestCase):
         return self
 
 
+    def test_advanced_search_iconography_pagination(self):
+        """
+        test that, with `limit` and `offset`, the pages contain all
+        the results of the unpaginated search, in the same order.
+        """
+        http_params = { "theme": [ "boutique" ], "namedEntity": [ "Galerie Vivienne" ], "themeBooleanOp": "or" }
+        with self.app.app_context():
+            expected = self.client.post(self.route, json=http_params).json
+            expected = [ i["id_uuid"] for i in expected ]
+            results, offset = [], 0
+            while True:
+                r = self.client.post(f"{self.route}?limit=7&offset={offset}", json=http_params)
+                self.assertEqual(r.status_code, 200)
+                self.assertEqual(r.json["total"], len(expected))
+                self.assertTrue(len(r.json["results"]) <= 7)
+                if not len(r.json["results"]):
+                    break
+                results += [ i["id_uuid"] for i in r.json["results"] ]
+                offset += 7
+            self.assertEqual( results, expected )
+            for query_string in [ "limit=0", "limit=abc", "limit=5&offset=-1", "limit=5&offset=abc" ]:
+                r = self.client.post(f"{self.route}?{query_string}", json=http_params)
+                self.assertEqual(r.status_code, 400, f"expected 400 with `{query_string}`")
+        return self
+
     def test_advanced_search_iconography_expected_problems(self):
         """
         test that expected problems happen: when passing invalid
@@ -399,6 +399,27 @@ class TestAdvancedSearchPublic(unittest.TestCase):
         tester_all_good(self, queries)
         return self
 
+    def test_pagination(self):
+        """
+        test that, with `limit` and `offset`, the pages contain all
+        the results of the unpaginated search.
+        """
+        http_params = { "named_entity": "Galerie Vivienne", "theme": "boutique", "theme_boolean_op": "or" }
+        with self.app.app_context():
+            expected = sorted( i["id_uuid"] for i in self.client.get(self.route, query_string=http_params).json )
+            results, offset = [], 0
+            while offset < len(expected):
+                r = self.client.get(self.route, query_string={ **http_params, "limit": 7, "offset": offset })
+                self.assertEqual(r.status_code, 200)
+                self.assertEqual(r.json["total"], len(expected))
+                results += [ i["id_uuid"] for i in r.json["results"] ]
+                offset += 7
+            self.assertEqual( sorted(results), expected )
+            self.assertEqual( len(set(results)), len(results), "a result is returned on several pages" )
+            r = self.client.get(self.route, query_string={ **http_params, "limit": 0 })
+            self.assertTrue( r.status_code >= 400 )
+        return self
+
     def test_expected_problems(self):
         """
         test that expected problems happen: when passing invalid
@@ -0,0 +1,33 @@
+"""
+test the route-level cache (`src/caching/cache_routes.py`):
+the cache keys of `cached_query` routes must identify a request
+without ambiguity.
+"""
+import unittest
+
+from ..caching.cache_routes import query_route_key
+from ..app import app
+
+
+class TestCacheKeys(unittest.TestCase):
+    def key(self, url:str, **kwargs) -> str:
+        """the `query_route_key` of a request to `url`"""
+        with app.test_request_context(url, **kwargs):
+            return query_route_key()
+
+    def test_query_route_key(self):
+        """
+        test that `query_route_key` produces the same key for equivalent
+        requests, and different keys for different requests
+        """
+        self.assertEqual( self.key("/i/route?a=1&b=2"), self.key("/i/route?b=2&a=1") )
+        # 2 uuids vs 1 uuid containing `&` and `=`
+        self.assertNotEqual( self.key("/i/iconography/from-uuid?id_uuid=a&id_uuid=b")
+                           , self.key("/i/iconography/from-uuid?id_uuid=a%26id_uuid%3Db") )
+        # the query string can't be mistaken for the body
+        self.assertNotEqual( self.key("/i/route?a=%23%7B%7D", method="POST")
+                           , self.key("/i/route?a=", method="POST", json={}) )
+        self.assertNotEqual( self.key("/i/route", method="POST", json={"a": 1})
+                           , self.key("/i/route", method="POST", json={"a": 2}) )
+        self.assertNotEqual( self.key("/i/route"), self.key("/i/route", method="POST") )
+        return self
@@ -0,0 +1,150 @@
+"""
+test the engines of the quick search (`src/search/search_quicksearch.py`)
+
+- `QUICKSEARCH_ENGINE = "fulltext"`: the `quicksearch` materialized view
+  must have been created with `db/20261018_quicksearch_fulltext.sql`:
+  if it doesn't exist, the tests are skipped.
+- `QUICKSEARCH_ENGINE = "memory"`: the trigram index must return
+  the same results as the ILIKE engine.
+- typeahead mode (`src/search/search_typeahead.py`): the pages of each
+  table must contain all results of the quick search, ranked, with
+  both the SQL and memory engines.
+"""
+from sqlalchemy import inspect
+from random import sample
+import unittest
+
+from ..search.search_quicksearch import ( quick_search_fulltext, quick_search_ilike, to_tsquery_prefix
+                                        , restructure_row, to_ilike )
+from ..search.search_trigram import quick_search_memory, IlikePattern
+from ..search.search_typeahead import typeahead, TABLES
+from ..app import app, db
+from .. import orm
+
+
+class TestQuickSearchFulltext(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.db = db
+        with self.app.app_context():
+            if "quicksearch" not in inspect(db.engine).get_materialized_view_names():
+                self.skipTest("the `quicksearch` materialized view doesn't exist")
+    def tearDown(self):
+        self.app = None
+        self.db = None
+
+    def test_to_tsquery_prefix(self):
+        """
+        test the conversion of query strings to tsquery expressions
+        """
+        self.assertEqual( to_tsquery_prefix("Rue Viv"), "rue:* & viv:*" )
+        self.assertEqual( to_tsquery_prefix("l'Opéra !"), "l:* & opéra:*" )
+        self.assertEqual( to_tsquery_prefix("  ?! "), "" )
+        return self
+
+    def test_entries_are_found(self):
+        """
+        test that themes, named entities and institutions are
+        found by their full name, with the same output format
+        as the ILIKE engine
+        """
+        with self.app.app_context():
+            for t in [ orm.Theme, orm.NamedEntity, orm.Institution ]:
+                rows = db.session.execute( db.select(t) ).scalars().all()
+                for row in sample(rows, min(len(rows), 10)):
+                    results = quick_search_fulltext(row.entry_name)
+                    self.assertIn( { "table_name": t.__tablename__
+                                   , "id_uuid"   : row.id_uuid
+                                   , "entry_name": row.entry_name }
+                                 , results
+                                 , f"on `{t.__tablename__}`: `{row.entry_name}` not found" )
+        return self
+
+
+class TestQuickSearchMemory(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.db = db
+    def tearDown(self):
+        self.app = None
+        self.db = None
+
+    def test_ilike_pattern(self):
+        """
+        test that ILIKE patterns are matched like in postgres
+        """
+        self.assertTrue( IlikePattern(to_ilike(" Rue ")).match("grande rue") )
+        self.assertFalse( IlikePattern(to_ilike("rue")).match("r-u-e") )
+        self.assertTrue( IlikePattern(to_ilike("r_e")).match("la rue") )
+        self.assertTrue( IlikePattern(to_ilike("r%vienne")).match("rue vivienne") )
+        self.assertFalse( IlikePattern(to_ilike("r\\_e")).match("la rue") )
+        self.assertTrue( IlikePattern(to_ilike("r\\_e")).match("r_e") )
+        self.assertTrue( IlikePattern(to_ilike("")).match("") )
+        return self
+
+    def test_same_results_as_ilike(self):
+        """
+        test that the trigram index returns the same rows as the SQL union
+        """
+        key = lambda rows: sorted( (r["table_name"], r["id_uuid"], r["entry_name"] or "") for r in rows )
+        with self.app.app_context():
+            entries = []
+            for t in [ orm.Title, orm.Actor, orm.Theme, orm.NamedEntity, orm.Institution ]:
+                entries += db.session.execute( db.select(t.entry_name) ).scalars().all()
+            entries += db.session.execute( db.select(orm.Address.address) ).scalars().all()
+            entries = [ e for e in entries if e ]
+            # full entries, parts of entries and wildcards
+            queries = ( [ "a", "ru", "rue", "  RUE ", "r%e", "r_e", "zzzzzz" ]
+                      + sample(entries, min(len(entries), 20))
+                      + [ e[len(e)//3 : 2*len(e)//3] for e in sample(entries, min(len(entries), 20)) ] )
+            for q in queries:
+                memory = [ restructure_row(row) for row in quick_search_memory(to_ilike(q)) ]
+                self.assertEqual( key(memory), key(quick_search_ilike(q)), f"different results for `{q}`" )
+        return self
+
+
+class TestQuickSearchTypeahead(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.db = db
+        self.engine = app.config.get("QUICKSEARCH_ENGINE", "ilike")
+    def tearDown(self):
+        self.app.config["QUICKSEARCH_ENGINE"] = self.engine
+        self.app = None
+        self.db = None
+
+    def test_pages(self):
+        """
+        test that, for each table, following the cursors returns all results
+        of the ILIKE quick search, without duplicates, prefix matches first
+        """
+        key = lambda r: (r["table_name"], r["id_uuid"], r["entry_name"] or "")
+        with self.app.app_context():
+            for engine in [ "ilike", "memory" ]:
+                self.app.config["QUICKSEARCH_ENGINE"] = engine
+                for q in [ "ru", "rue", "paris", "richelieu" ]:
+                    expected = quick_search_ilike(q)
+                    first = typeahead(q, limit=10)
+                    self.assertEqual( list(first.keys()), list(TABLES.keys()) )
+                    for tn, page in first.items():
+                        results = page["results"]
+                        while page["cursor"] is not None:
+                            page = typeahead(q, limit=10, table=tn, cursor=page["cursor"])[tn]
+                            results += page["results"]
+                        expected_tn = [ r for r in expected if r["table_name"] == tn ]
+                        self.assertEqual( first[tn]["total"], len(expected_tn), f"{engine}: wrong total for `{q}` on `{tn}`" )
+                        self.assertEqual( sorted(map(key, results)), sorted(map(key, expected_tn)), f"{engine}: wrong results for `{q}` on `{tn}`" )
+                        prefix = [ (r["entry_name"] or "").lower().startswith(q) for r in results ]
+                        self.assertEqual( prefix, sorted(prefix, reverse=True), f"{engine}: prefix matches must be first" )
+        return self
+
+    def test_invalid_params(self):
+        """
+        test that invalid parameters return a HTTP 400
+        """
+        client = self.app.test_client()
+        for params in [ "limit=0", "limit=-3", "limit=1000", "limit=abc", "limit=", "limit=2.5"
+                      , "table=actor", "cursor=abc", "table=theme&cursor=abc" ]:
+            r = client.get(f"/i/search/typeahead/rue?{params}")
+            self.assertEqual( r.status_code, 400, f"expected 400 with `{params}`" )
+        return self
@@ -3,6 +3,9 @@ import unittest
 from .serializations import TestSerializations
 from .advanced_search_internal import TestAdvancedSearchInternal
 from .advanced_search_public import TestAdvancedSearchPublic
+from .advanced_search_bitmap import TestBitmaps, TestAdvancedSearchInternalBitmap, TestAdvancedSearchPublicBitmap
+from .cache import TestCacheKeys
+from .quicksearch import TestQuickSearchFulltext, TestQuickSearchMemory, TestQuickSearchTypeahead
 
 def load_tests( loader=unittest.TestLoader()
               , tests=[]
@@ -14,6 +17,13 @@ def load_tests( loader=unittest.TestLoader()
     test_cases = [ TestSerializations
                  , TestAdvancedSearchInternal
                  , TestAdvancedSearchPublic
+                 , TestBitmaps
+                 , TestAdvancedSearchInternalBitmap
+                 , TestAdvancedSearchPublicBitmap
+                 , TestQuickSearchFulltext
+                 , TestQuickSearchMemory
+                 , TestQuickSearchTypeahead
+                 , TestCacheKeys
                  ]
     # suite of tests that will be run
     suite = unittest.TestSuite()
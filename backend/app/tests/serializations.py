@@ -1,8 +1,13 @@
 from sqlalchemy.orm import Session
 from random import randint
 import unittest
+import time
 
+from ..serialization import serialize_sql, serialize_main
+from ..serialization.serialize_columnar import from_columnar, to_columnar
+from ..caching.cache_serialize import serialization_cache
 from ..app import app, db
+from ..utils.spatial import geometry_to_feature, featurelist_to_featurecollection
 from .. import orm
 
 
@@ -86,5 +91,196 @@ class TestSerializations(unittest.TestCase):
         return self
 
 
+    def test_serialize_lite_bulk(self):
+        """
+        test that `Iconography.serialize_lite_bulk` returns the same
+        thing as `Iconography.serialize_lite`, in the order of the ids.
+        the order of titles/authors that aren't main is not checked.
+        """
+        with self.app.app_context():
+            objs = db.session.execute( db.select(orm.Iconography).limit(50) ).scalars().all()
+            ids = [ o.id for o in objs ][::-1]  # reverse, to check that the order of `ids` is kept
+            bulk = orm.Iconography.serialize_lite_bulk(ids)
+            self.assertEqual( len(bulk), len(ids) )
+            for obj, b in zip(objs[::-1], bulk):
+                lite = obj.serialize_lite()
+                self.assertEqual( lite.keys(), b.keys() )
+                for k in lite.keys():
+                    if isinstance(lite[k], list) and k != "date":
+                        self.assertEqual( sorted(map(str, lite[k])), sorted(map(str, b[k])), f"on `{k}`" )
+                    else:
+                        self.assertEqual( lite[k], b[k], f"on `{k}`" )
+        return self
+
+
+    def test_memoized_serialize_lite(self):
+        """
+        test that the memoized `Iconography.serialize_lite_bulk`
+        (`caching/cache_serialize.py`) returns the same thing as
+        without memoization, and is faster than recomputing it
+        """
+        def best_time(ids, repeat=5):
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                out = orm.Iconography.serialize_lite_bulk(ids)
+                times.append(time.perf_counter() - start)
+            return min(times), out
+
+        size = self.app.config.get("SERIALIZE_CACHE_SIZE", 0)
+        with self.app.app_context():
+            ids = db.session.execute( db.select(orm.Iconography.id).limit(500) ).scalars().all()
+            try:
+                self.app.config["SERIALIZE_CACHE_SIZE"] = 0
+                recompute, expected = best_time(ids)
+                self.app.config["SERIALIZE_CACHE_SIZE"] = 20000
+                serialization_cache.clear()
+                orm.Iconography.serialize_lite_bulk(ids)  # fill the cache
+                memoized, out = best_time(ids)
+            finally:
+                self.app.config["SERIALIZE_CACHE_SIZE"] = size
+                serialization_cache.clear()
+            self.assertEqual( out, expected )
+            self.assertLess( memoized, recompute )
+        return self
+
+
+    def test_place_serialize_lite_bulk(self):
+        """
+        test that `Place.serialize_lite_bulk` (with bulk iconography
+        counts) returns the same thing as `Place.serialize_lite`
+        """
+        with self.app.app_context():
+            places = db.session.execute( db.select(orm.Place)
+                                           .options(*orm.Place.lite_options())
+                                           .limit(50) ).scalars().all()
+            self.assertEqual( orm.Place.serialize_lite_bulk(places)
+                            , [ p.serialize_lite() for p in places ] )
+        return self
+
+
+    def test_sql_engine(self):
+        """
+        test that the SQL serialization engine (`serialization/serialize_sql.py`)
+        produces the same response body as the ORM serializers, for the same rows
+        in the same order. the bodies are built by `app.json.response`, like
+        `jsonify` in the routes, and compared byte by byte.
+        """
+        body = lambda obj: self.app.json.response(obj).get_data()
+        with self.app.app_context():
+            ids = db.session.execute( db.select(orm.Iconography.id)
+                                        .order_by(orm.Iconography.id) ).scalars().all()
+            self.assertEqual( body(serialize_sql.iconography_lite())
+                            , body(orm.Iconography.serialize_lite_bulk(ids)) )
+
+            places = db.session.execute( db.select(orm.Place)
+                                           .options(*orm.Place.lite_options())
+                                           .order_by(orm.Place.id) ).scalars().all()
+            self.assertEqual( body(serialize_sql.place_lite())
+                            , body(orm.Place.serialize_lite_bulk(places)) )
+
+            themes = db.session.execute( db.select(orm.Theme)
+                                           .order_by(orm.Theme.id) ).scalars().all()
+            self.assertEqual( body(serialize_sql.theme_lite())
+                            , body([ t.serialize_lite() for t in themes ]) )
+        return self
+
+
+    def test_public_api_trusted_serialization(self):
+        """
+        test that the public API returns the same output with and
+        without pydantic validation (see `API_VALIDATE_OUTPUT`)
+        """
+        from ..routes.api_public import ICONOGRAPHY_RESOURCE
+        with self.app.app_context():
+            objs = db.session.execute( db.select(orm.Iconography).limit(20) ).scalars().all()
+            for obj in objs:
+                for lite in [ True, False ]:
+                    self.assertEqual( ICONOGRAPHY_RESOURCE.serialize(obj, lite=lite, validate=True)
+                                    , ICONOGRAPHY_RESOURCE.serialize(obj, lite=lite, validate=False) )
+        return self
+
+
+    def test_public_api_loader_options(self):
+        """
+        test that a page of the public API is serialized in a bounded number
+        of queries with `Resource.loader_options`, and that the output is
+        the same as without them
+        """
+        from sqlalchemy import event
+        from ..routes.api_public import ICONOGRAPHY_RESOURCE
+        queries = []
+        def count(*args, **kwargs):
+            queries.append(1)
+
+        with self.app.app_context():
+            expected = [ ICONOGRAPHY_RESOURCE.serialize(obj)
+                         for obj in db.session.execute( db.select(orm.Iconography)
+                                                          .order_by(orm.Iconography.id)
+                                                          .limit(20) ).scalars() ]
+            db.session.expunge_all()
+            event.listen(db.engine, "before_cursor_execute", count)
+            try:
+                page = db.session.execute( db.select(orm.Iconography)
+                                             .options(*ICONOGRAPHY_RESOURCE.loader_options)
+                                             .order_by(orm.Iconography.id)
+                                             .limit(20) ).unique().scalars().all()
+                output = [ ICONOGRAPHY_RESOURCE.serialize(obj) for obj in page ]
+            finally:
+                event.remove(db.engine, "before_cursor_execute", count)
+            self.assertEqual( output, expected )
+            self.assertLessEqual( len(queries), 2 * len(ICONOGRAPHY_RESOURCE.loader_options) + 1 )
+        return self
+
+
+    def test_columnar_format(self):
+        """
+        test that the listing routes return the same objects
+        in the default and columnar (`?format=columnar`) formats
+        """
+        client = self.app.test_client()
+        for route in [ "/i/iconography"
+                     , "/i/place"
+                     , "/i/theme/category/all"
+                     , "/i/named-entity/category/all" ]:
+            expected = client.get(route).get_json()
+            columnar = client.get(f"{route}?format=columnar").get_json()
+            self.assertEqual( columnar["format"], "columnar", f"on `{route}`" )
+            self.assertEqual( from_columnar(columnar), expected, f"on `{route}`" )
+        self.assertEqual( client.get("/i/place?format=invalid").status_code, 400 )
+
+        # values that are equal in python but not in JSON are encoded separately
+        records = [ {"a": True}, {"a": 1}, {"a": 1.0}, {"a": 1} ]
+        columnar = to_columnar(records, dictionary=["a"])
+        self.assertEqual( columnar["dictionaries"]["a"], [True, 1, 1.0] )
+        self.assertEqual( [ type(r["a"]) for r in from_columnar(columnar) ], [bool, int, float, int] )
+        return self
+
+
+    def test_iconography_main(self):
+        """
+        test that the detail loader of the iconography page
+        (`serialization/serialize_main.py`) returns the same thing as
+        `Iconography.serialize_full` with the places converted to geojson
+        """
+        with self.app.app_context():
+            objs = db.session.execute( db.select(orm.Iconography).limit(20) ).scalars().all()
+            for obj in objs:
+                expected = obj.serialize_full()
+                expected["place"] = featurelist_to_featurecollection([
+                    geometry_to_feature(p["vector"], custom_properties={"id_uuid": p["id_uuid"]})
+                    for p in expected["place"] ])
+                out = serialize_main.iconography_main(obj.id_uuid)
+                self.assertEqual( len(out), 1 )
+                for k in expected.keys():
+                    if k in [ "place", "theme", "named_entity" ]:
+                        key = lambda x: str(x)  # the order of relations isn't checked
+                        items = lambda x: x["features"] if k == "place" else x
+                        self.assertEqual( sorted(items(out[0][k]), key=key), sorted(items(expected[k]), key=key), f"on `{k}`" )
+                    else:
+                        self.assertEqual( out[0][k], expected[k], f"on `{k}`" )
+        return self
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,7 @@ UTILS = os.path.abspath(os.path.dirname(__file__))
 APP = os.path.abspath(os.path.join(UTILS, os.pardir))
 BACKEND = os.path.abspath(os.path.join(APP, os.pardir))
 TMP = os.path.abspath(os.path.join(APP, "tmp"))
+CACHE = os.path.abspath(os.path.join(TMP, "cache"))
 BACKEND = os.path.abspath(os.path.join(APP, os.pardir))
 ORM = os.path.abspath(os.path.join(APP, "orm"))
 ROUTES = os.path.abspath(os.path.join(APP, "routes"))
@@ -0,0 +1,82 @@
+from flask.json.provider import DefaultJSONProvider
+from psycopg2.extras import NumericRange
+from flask import Flask, Response
+import typing as t
+import orjson
+
+from .converters import int4range2list
+
+
+# ******************************************************
+# JSON providers for the Flask app (used by `jsonify`).
+#
+# - `JSONProvider`: Flask's default provider (stdlib `json`),
+#   that also serializes postgres ranges.
+# - `OrjsonProvider`: the same thing, but the encoding is done
+#   with `orjson`, which is much faster on large payloads (the
+#   GeoJSON of places, the iconography index...).
+#
+# the provider is chosen with `JSON_PROVIDER` in the config
+# (see `set_json_provider`). the output of both providers is
+# the same JSON, except that `orjson` doesn't escape non-ASCII
+# characters (the body is UTF-8) and encodes `NaN` as `null`.
+# ******************************************************
+
+
+def _default(o:t.Any) -> t.Any:
+    """
+    serialize the types that aren't supported natively:
+    postgres ranges are converted to lists (see `int4range2list`),
+    everything else is handled by Flask's default provider.
+    """
+    if isinstance(o, NumericRange):
+        return int4range2list(o)
+    return DefaultJSONProvider.default(o)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    Flask's default provider, supporting postgres ranges.
+    """
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    JSON provider using `orjson` for encoding and decoding.
+    dict keys are sorted and the output is compact, like with
+    `DefaultJSONProvider` (indented in debug mode).
+    """
+    def dumps(self, obj:t.Any, **kwargs) -> str:
+        return self._dumps(obj, indent=kwargs.get("indent", None) is not None).decode()
+
+    def loads(self, s:str|bytes, **kwargs) -> t.Any:
+        return orjson.loads(s)
+
+    def _dumps(self, obj:t.Any, indent:bool=False) -> bytes:
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def response(self, *args, **kwargs) -> Response:
+        """
+        same as `DefaultJSONProvider.response`, but the bytes produced by
+        `orjson` are passed directly to the response, without decoding.
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class( self._dumps(obj, indent=indent) + b"\n"
+                                       , mimetype=self.mimetype )
+
+
+def set_json_provider(app:Flask) -> None:
+    """
+    set the JSON provider of `app` based on `JSON_PROVIDER` in the config:
+    `"orjson"` or `"default"`.
+    """
+    if app.config.get("JSON_PROVIDER", "default") == "orjson":
+        app.json = OrjsonProvider(app)
+    else:
+        app.json = JSONProvider(app)
+    return
@@ -0,0 +1,48 @@
+"""
+gunicorn configuration, read automatically by `gunicorn prod-gunicorn:app`
+when it is run from `backend/`.
+
+the cache warm up (`app/caching/cache_warmup.py`) is run once, by the
+master process, before the workers are started: with `CACHE_WARMUP = "sync"`,
+the workers only take traffic once the cache is full. it is run in a separate
+process (`flask ... cache-warmup`), so that the master never loads the app:
+the workers would inherit its database connexions.
+
+each worker then builds its own trigram index for the quick search
+(`app/search/search_trigram.py`), once it has loaded the app.
+"""
+import subprocess
+import sys
+
+from app.config import PROD
+
+
+WARMUP_COMMAND = [ sys.executable, "-m", "flask", "--app", "app.app:config_app('prod')", "cache-warmup" ]
+
+
+def when_ready(server) -> None:
+    """
+    fill the cache, depending on `CACHE_WARMUP` in the `PROD` config:
+    - "sync"      : before the workers are started
+    - "background": while the workers start
+    - anything else: no warm up
+    """
+    mode = getattr(PROD, "CACHE_WARMUP", None)
+    if mode == "sync":
+        server.log.info("cache warmup: starting")
+        r = subprocess.run(WARMUP_COMMAND)
+        server.log.info(f"cache warmup: finished with exit code {r.returncode}")
+    elif mode == "background":
+        subprocess.Popen(WARMUP_COMMAND)
+    return
+
+
+def post_worker_init(worker) -> None:
+    """
+    build the trigram index of the worker in a background thread,
+    if `QUICKSEARCH_ENGINE` is "memory" in the `PROD` config.
+    `worker.wsgi` is the app loaded by the worker (`prod-gunicorn:app`).
+    """
+    from app.search.search_trigram import start_trigram_index  # only imported in the workers, which have loaded the app
+    start_trigram_index(worker.wsgi)
+    return
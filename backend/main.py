@@ -3,6 +3,8 @@ import atexit
 import click
 
 from app.app import config_app
+from app.caching.cache_warmup import start_warmup
+from app.search.search_trigram import start_trigram_index
 from app.utils.io import maketmp, deltmp # , write_credfile, read_credfile
 from app.tests.runner import runner
 
@@ -25,6 +27,8 @@ def run(mode:str) -> None:
         # errors in the production env's journals
         try:
             debug = True if mode != "prod" else False  # disable debug mode in prod 
+            start_warmup(app)  # fill the cache, if `CACHE_WARMUP` is set in the config
+            start_trigram_index(app)  # build the index of the quick search, if `QUICKSEARCH_ENGINE = "memory"`
             app.run(port=5001, debug=debug)
         except Exception as e:
             app.logger.error(traceback.format_exc())
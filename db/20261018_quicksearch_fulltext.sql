@@ -0,0 +1,132 @@
+--
+-- full-text search index for the quick search
+-- (`backend/app/search/search_quicksearch.py`, `QUICKSEARCH_ENGINE = "fulltext"`)
+--
+-- creates:
+-- - the `unaccent` extension
+-- - the `french_unaccent` text search configuration: the `french`
+--   configuration, with accents removed before stemming
+-- - the `quicksearch` materialized view: 1 row per result of the quick
+--   search (`table_name`, `id_uuid`, `entry_name`), with a `document`
+--   (tsvector) containing all the text that the row is matched against
+-- - a GIN index on `quicksearch.document`
+-- - a unique index on (`table_name`, `id_uuid`, `entry_name`), needed
+--   to refresh the view with `REFRESH MATERIALIZED VIEW CONCURRENTLY`,
+--   which doesn't block the searches while the view is recomputed
+--
+-- the rows are the same as those of the ILIKE quick search:
+-- - iconography: 1 row per title. the document contains all
+--   titles and all actors (authors and publishers)
+-- - place: 1 row per address. the document contains all addresses
+-- - theme, named_entity, institution: 1 row per entry, the document
+--   contains the `entry_name`
+--
+-- the view must be refreshed after an import. this is done when the
+-- data version changes (`flask cache-bump-version`), or with:
+-- `flask --app "app.app:config_app('prod')" quicksearch-refresh`
+-- an import that doesn't bump the data version or refresh the view
+-- leaves the full-text engine serving the old data.
+--
+-- usage: psql -d richelieu_db -f 20261018_quicksearch_fulltext.sql
+--
+
+CREATE EXTENSION IF NOT EXISTS "unaccent" WITH SCHEMA "public";
+
+DROP MATERIALIZED VIEW IF EXISTS "public"."quicksearch";
+DROP TEXT SEARCH CONFIGURATION IF EXISTS "public"."french_unaccent";
+
+CREATE TEXT SEARCH CONFIGURATION "public"."french_unaccent" ( COPY = "pg_catalog"."french" );
+ALTER TEXT SEARCH CONFIGURATION "public"."french_unaccent"
+    ALTER MAPPING FOR "hword", "hword_part", "word"
+    WITH "public"."unaccent", "pg_catalog"."french_stem";
+
+
+CREATE MATERIALIZED VIEW "public"."quicksearch" AS
+    -- iconography
+    SELECT DISTINCT
+        'iconography'::"text" AS "table_name",
+        "iconography"."id_uuid",
+        "title"."entry_name",
+        "document"."document"
+    FROM "public"."iconography"
+    JOIN "public"."title"
+    ON "title"."id_iconography" = "iconography"."id"
+    JOIN (
+        SELECT
+            "i"."id" AS "id_iconography",
+            "pg_catalog"."to_tsvector"( 'public.french_unaccent'::"regconfig"
+                                      , "concat_ws"( ' '
+                                                   , ( SELECT "string_agg"("t"."entry_name", ' ')
+                                                       FROM "public"."title" "t"
+                                                       WHERE "t"."id_iconography" = "i"."id" )
+                                                   , ( SELECT "string_agg"("a"."entry_name", ' ')
+                                                       FROM "public"."r_iconography_actor" "r"
+                                                       JOIN "public"."actor" "a"
+                                                       ON "a"."id" = "r"."id_actor"
+                                                       WHERE "r"."id_iconography" = "i"."id" ) ) ) AS "document"
+        FROM "public"."iconography" "i"
+    ) "document"
+    ON "document"."id_iconography" = "iconography"."id"
+
+    UNION ALL
+
+    -- place (accessed by its addresses)
+    SELECT DISTINCT
+        'place'::"text" AS "table_name",
+        "place"."id_uuid",
+        "address"."address" AS "entry_name",
+        "document"."document"
+    FROM "public"."place"
+    JOIN "public"."r_address_place"
+    ON "r_address_place"."id_place" = "place"."id"
+    JOIN "public"."address"
+    ON "address"."id" = "r_address_place"."id_address"
+    JOIN (
+        SELECT
+            "r"."id_place",
+            "pg_catalog"."to_tsvector"( 'public.french_unaccent'::"regconfig"
+                                      , "string_agg"("a"."address", ' ') ) AS "document"
+        FROM "public"."r_address_place" "r"
+        JOIN "public"."address" "a"
+        ON "a"."id" = "r"."id_address"
+        GROUP BY "r"."id_place"
+    ) "document"
+    ON "document"."id_place" = "place"."id"
+
+    UNION ALL
+
+    -- theme
+    SELECT
+        'theme'::"text" AS "table_name",
+        "theme"."id_uuid",
+        "theme"."entry_name",
+        "pg_catalog"."to_tsvector"('public.french_unaccent'::"regconfig", "theme"."entry_name") AS "document"
+    FROM "public"."theme"
+
+    UNION ALL
+
+    -- named_entity
+    SELECT
+        'named_entity'::"text" AS "table_name",
+        "named_entity"."id_uuid",
+        "named_entity"."entry_name",
+        "pg_catalog"."to_tsvector"('public.french_unaccent'::"regconfig", "named_entity"."entry_name") AS "document"
+    FROM "public"."named_entity"
+
+    UNION ALL
+
+    -- institution
+    SELECT
+        'institution'::"text" AS "table_name",
+        "institution"."id_uuid",
+        "institution"."entry_name",
+        "pg_catalog"."to_tsvector"('public.french_unaccent'::"regconfig", "institution"."entry_name") AS "document"
+    FROM "public"."institution"
+WITH DATA;
+
+
+-- the rows are distinct on those columns: `DISTINCT` for iconography and
+-- place (the document only depends on `id_uuid`), `id_uuid` for the rest
+CREATE UNIQUE INDEX "quicksearch_unique_idx" ON "public"."quicksearch" USING "btree" ("table_name", "id_uuid", "entry_name");
+CREATE INDEX "quicksearch_document_idx" ON "public"."quicksearch" USING "gin" ("document");
+CREATE INDEX "quicksearch_table_name_idx" ON "public"."quicksearch" USING "btree" ("table_name");